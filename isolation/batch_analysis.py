@@ -0,0 +1,200 @@
+"""Analyse many Isolation positions with worker processes that share a
+transposition table.
+
+`BatchAnalyzer` spreads a stream of positions over a pool of worker processes.
+Each worker searches its positions with its own `AlphaBetaPlayer`, but all of
+them read and write the same `TranspositionTable` in shared memory, so work
+done on one position is reused for the related positions that dataset and
+opening book jobs produce. Results are yielded as soon as they are ready, in
+completion order.
+
+Usage:
+
+    with BatchAnalyzer(processes=4) as analyzer:
+        for result in analyzer.analyse(boards, depth=8):
+            print(result.index, result.move, result.score)
+
+    python batch_analysis.py positions.txt --depth 8 > labels.jsonl
+
+where positions.txt holds one `Board.to_bytes()` encoding per line, in hex.
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+import timeit
+
+from collections import namedtuple
+
+from isolation import Board
+from isolation.movement import MOVEMENTS
+from isolation.transposition import TranspositionTable
+from game_agent import AlphaBetaPlayer, SearchTimeout
+
+Position = namedtuple("Position", ["board", "depth", "time_limit"])
+Position.__new__.__defaults__ = (None, None)
+
+Analysis = namedtuple("Analysis", ["index", "move", "score", "depth", "ms"])
+
+_worker = {}
+
+
+def _init_worker(factory, table_name):
+    table = TranspositionTable.attach(table_name)
+    player = factory()
+    player.transposition_table = table
+    _worker["player"] = player
+
+
+def _analyse(task):
+    index, data, movement, depth, time_limit = task
+    player = _worker["player"]
+    board = Board.from_bytes(data, movement=movement, active=player)
+
+    start = timeit.default_timer()
+    if time_limit is None:
+        time_left = lambda: float("inf")
+    else:
+        time_left = lambda: time_limit - 1000 * (timeit.default_timer() - start)
+
+    if depth is None:
+        move = player.get_move(board, time_left)
+        score = player.search_stats.get("score")
+        reached = player.search_stats["depth"]
+    else:
+        # iterative deepening up to the requested depth, so the shallow
+        # iterations fill the table with moves that order the deeper ones
+        player.time_left = time_left
+        move, score, reached = (-1, -1), None, 0
+        for d in range(1, min(depth, len(board.get_blank_spaces())) + 1):
+            try:
+                move = player.alphabeta(board, d)
+            except SearchTimeout:
+                break
+            score, reached = player.search_stats["score"], d
+
+    ms = 1000 * (timeit.default_timer() - start)
+    return Analysis(index, tuple(move), score, reached, ms)
+
+
+class BatchAnalyzer(object):
+    """A pool of worker processes that search positions with a shared
+    transposition table.
+
+    Parameters
+    ----------
+    factory : callable (optional)
+        Called without arguments in each worker to construct its
+        `AlphaBetaPlayer`; the analyzer sets its `transposition_table`. It
+        must be picklable unless the platform starts processes by forking.
+
+    processes : int (optional)
+        The number of worker processes (default: the number of CPUs).
+
+    table_slots : int (optional)
+        The number of transposition table entries (24 bytes each).
+
+    depth : int (optional)
+        The default search depth of a position.
+
+    time_limit : float (optional)
+        The default time budget of a position in milliseconds, used when
+        no depth is given.
+
+    movement : `isolation.movement.Movement` (optional)
+        The movement rule of positions given as `Board.to_bytes` encodings,
+        which do not record it; knight moves if None. Boards are searched
+        with their own rule.
+    """
+
+    def __init__(self, factory=AlphaBetaPlayer, processes=None, table_slots=1 << 20,
+                 depth=None, time_limit=1000., movement=None):
+        self.depth = depth
+        self.time_limit = time_limit
+        self.movement = movement
+        self.table = TranspositionTable(table_slots, shared=True)
+        self._pool = multiprocessing.Pool(processes, initializer=_init_worker,
+                                          initargs=(factory, self.table.name))
+
+    def analyse(self, positions, depth=None, time_limit=None):
+        """Search a stream of positions and yield an `Analysis` for each.
+
+        Parameters
+        ----------
+        positions : iterable<`isolation.Board` or `Position` or bytes>
+            The positions to analyse, as boards, `Board.to_bytes` encodings
+            or `Position` tuples that set their own depth or time budget.
+
+        depth, time_limit : (optional)
+            The budget of positions that do not set their own, overriding
+            the analyzer defaults. A depth takes precedence over a time
+            limit.
+
+        Yields
+        ------
+        Analysis
+            The index of the position in the stream, the best move found
+            ((-1, -1) if the side to move is stuck), its score for the side
+            to move, the depth of the last completed iteration and the time
+            spent in milliseconds, in the order the workers finish them.
+        """
+        default_depth = self.depth if depth is None else depth
+        default_time = self.time_limit if time_limit is None else time_limit
+
+        def tasks():
+            for index, position in enumerate(positions):
+                if not isinstance(position, Position):
+                    position = Position(position)
+                board = position.board
+                if isinstance(board, bytes):
+                    data, movement = board, self.movement
+                else:
+                    data, movement = board.to_bytes(), board.movement
+                pos_depth, pos_time = position.depth, position.time_limit
+                if pos_depth is None and pos_time is None:
+                    pos_depth, pos_time = default_depth, default_time
+                yield index, data, movement, pos_depth, pos_time
+
+        return self._pool.imap_unordered(_analyse, tasks())
+
+    def close(self):
+        """Stop the workers and free the shared table. """
+        self._pool.terminate()
+        self._pool.join()
+        self.table.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("positions", nargs="?", default="-",
+                        help="File with one hex encoded position per line (default: stdin).")
+    parser.add_argument("--depth", type=int, default=None,
+                        help="Search every position to this depth.")
+    parser.add_argument("--time", type=float, default=1000.,
+                        help="Milliseconds per position when no depth is given.")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--slots", type=int, default=1 << 20,
+                        help="Number of shared transposition table entries.")
+    parser.add_argument("--movement", choices=sorted(MOVEMENTS), default=None,
+                        help="Movement rule of the positions (default: knight).")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.positions == "-" else open(args.positions)
+    positions = (bytes.fromhex(line.strip()) for line in source if line.strip())
+    with BatchAnalyzer(processes=args.processes, table_slots=args.slots,
+                       depth=args.depth, time_limit=args.time,
+                       movement=MOVEMENTS[args.movement] if args.movement else None) as analyzer:
+        for result in analyzer.analyse(positions):
+            print(json.dumps(result._asdict()), flush=True)
+    if source is not sys.stdin:
+        source.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,14 @@ and include the results in your report.
 """
 import random
 
+from isolation.transposition import EXACT, LOWER, UPPER
+from sample_players import open_move_score
+
+# XOR-ed into the key of positions searched on behalf of player 2, so that
+# scores computed from the two players' points of view never collide in a
+# shared transposition table
+PERSPECTIVE_KEY = 0x9E3779B97F4A7C15
+
 
 class SearchTimeout(Exception):
     """Subclass base exception for code clarity. """
@@ -43,15 +51,16 @@ def custom_score(game, player):
     own_moves = game.get_legal_moves(player)
     opp_moves = game.get_legal_moves(game.get_opponent(player))
 
-    w, h = (game.width - 1) / 2., (game.height - 1) / 2.
+    centrality = game.geometry.centrality
+    cell_index = game.geometry.cell_index
 
     own_val = float(0)
-    for y_own, x_own in own_moves:
-        own_val += y_own * (2 * h - y_own) + x_own * (2 * w - x_own)
+    for move in own_moves:
+        own_val += centrality[cell_index[move]]
 
     opp_val = float(0)
-    for y_opp, x_opp in opp_moves:
-        opp_val += y_opp * (2 * h - y_opp) + x_opp * (2 * w - x_opp)
+    for move in opp_moves:
+        opp_val += centrality[cell_index[move]]
 
     score = float(own_val - opp_val)
 
@@ -88,7 +97,8 @@ def custom_score_2(game, player):
     own_moves = game.get_legal_moves(player)
     opp_moves = game.get_legal_moves(game.get_opponent(player))
 
-    opp_pressure = 0.25 + (49 - len(game.get_blank_spaces())) / (49 * 2)
+    num_cells = game.geometry.size
+    opp_pressure = 0.25 + (num_cells - len(game.get_blank_spaces())) / (num_cells * 2)
 
     score = (1 - opp_pressure) * len(own_moves) - opp_pressure * len(opp_moves)
 
@@ -126,23 +136,159 @@ def custom_score_3(game, player):
     own_moves = game.get_legal_moves(player)
     opp_moves = game.get_legal_moves(game.get_opponent(player))
 
-    w, h = (game.width - 1) / 2., (game.height - 1) / 2.
+    centrality = game.geometry.centrality
+    cell_index = game.geometry.cell_index
 
     own_val = float(0)
-    for y_own, x_own in own_moves:
-        own_val += y_own * (2 * h - y_own) + x_own * (2 * w - x_own)
+    for move in own_moves:
+        own_val += centrality[cell_index[move]]
 
     opp_val = float(0)
-    for y_opp, x_opp in opp_moves:
-        opp_val += y_opp * (2 * h - y_opp) + x_opp * (2 * w - x_opp)
+    for move in opp_moves:
+        opp_val += centrality[cell_index[move]]
 
-    opp_pressure = 0.25 + (49 - len(game.get_blank_spaces())) / (49 * 2)
+    num_cells = game.geometry.size
+    opp_pressure = 0.25 + (num_cells - len(game.get_blank_spaces())) / (num_cells * 2)
 
     score = (1 - opp_pressure) * own_val - opp_pressure * opp_val
 
     return score
 
 
+def popcount(mask):
+    """Return the number of cells in a bitboard. """
+    return bin(mask).count("1")
+
+
+def second_order_mobility(game, player):
+    """Return the number of blank cells the player can reach in one or two
+    of its own moves, computed on bitboards without forecasting any move.
+    """
+    return popcount(game.reachable_mask(player, 2))
+
+
+def exclusive_area(game, player):
+    """Return the number of blank cells the player can eventually reach and
+    its opponent cannot.
+    """
+    return popcount(game.exclusive_mask(player))
+
+
+def second_order_score(game, player):
+    """Calculate the heuristic value of a game state from the point of view
+    of the given player as the difference between the numbers of cells each
+    player can reach within two moves.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` encoding the current state of the
+        game (e.g., player locations and blocked cells).
+
+    player : object
+        A player instance in the current game (i.e., an object corresponding to
+        one of the player objects `game.__player_1__` or `game.__player_2__`.)
+
+    Returns
+    -------
+    float
+        The heuristic value of the current game state to the specified player.
+    """
+    if game.is_loser(player):
+        return float("-inf")
+
+    if game.is_winner(player):
+        return float("inf")
+
+    own_reach = second_order_mobility(game, player)
+    opp_reach = second_order_mobility(game, game.get_opponent(player))
+    return float(own_reach - opp_reach)
+
+
+class TieredScore:
+    """Score function that evaluates nodes near the root with an expensive
+    heuristic and the rest with a cheap one, to keep the search deep when
+    time runs short.
+
+    A node is evaluated with `expensive` if the searching player has at
+    least `low_time` milliseconds left and either the node is at most
+    `root_plies` plies below the root or the player has at least
+    `plentiful_time` milliseconds left, as long as fewer than
+    `expensive_budget` expensive evaluations were made for the current move.
+    Every other node is evaluated with `cheap`. The thresholds and the
+    number of evaluations of each tier are reported under "score_tiers" in
+    the player's `search_stats`.
+
+    Parameters
+    ----------
+    expensive : callable (optional)
+        The score function used near the root or when time is plentiful.
+
+    cheap : callable (optional)
+        The score function used at deep or low-time nodes.
+
+    root_plies : int (optional)
+        The depth below the root up to which nodes are evaluated with
+        `expensive`.
+
+    low_time : float (optional)
+        Milliseconds left below which every node is evaluated with `cheap`.
+
+    plentiful_time : float (optional)
+        Milliseconds left above which every node is evaluated with
+        `expensive`; disabled if None.
+
+    expensive_budget : int (optional)
+        The maximum number of expensive evaluations per move; unlimited if
+        None.
+    """
+    def __init__(self, expensive=custom_score, cheap=open_move_score, root_plies=2,
+                 low_time=30., plentiful_time=None, expensive_budget=None):
+        self.expensive = expensive
+        self.cheap = cheap
+        self.root_plies = root_plies
+        self.low_time = low_time
+        self.plentiful_time = plentiful_time
+        self.expensive_budget = expensive_budget
+
+    def __call__(self, game, player):
+        stats = self.tier_stats(player)
+        time_left = getattr(player, "time_left", None)
+        root_move_count = getattr(player, "root_move_count", None)
+
+        use_expensive = True
+        if self.expensive_budget is not None and stats["expensive"] >= self.expensive_budget:
+            use_expensive = False
+        elif time_left is not None:
+            remaining = time_left()
+            near_root = (root_move_count is None or
+                         game.move_count - root_move_count <= self.root_plies)
+            use_expensive = remaining >= self.low_time and (
+                near_root or (self.plentiful_time is not None and
+                              remaining >= self.plentiful_time))
+
+        if use_expensive:
+            stats["expensive"] += 1
+            return self.expensive(game, player)
+        stats["cheap"] += 1
+        return self.cheap(game, player)
+
+    def tier_stats(self, player):
+        """Return the evaluation counters of the current move, stored in the
+        player's `search_stats` (not kept for players without one).
+        """
+        search_stats = getattr(player, "search_stats", None)
+        if search_stats is None:
+            search_stats = {}
+        stats = search_stats.get("score_tiers")
+        if stats is None:
+            stats = search_stats["score_tiers"] = {
+                "expensive": 0, "cheap": 0, "root_plies": self.root_plies,
+                "low_time": self.low_time, "plentiful_time": self.plentiful_time,
+                "expensive_budget": self.expensive_budget}
+        return stats
+
+
 
 
 
@@ -359,11 +505,214 @@ class MinimaxPlayer(IsolationPlayer):
             v = max(v, self.min_value(game.forecast_move(m), current_depth + 1))
         return v
 
+class SelectiveSearch:
+    """Configuration for the selective search layer of `AlphaBetaPlayer`.
+
+    Late move reductions search moves that come late in the move list to a
+    shallower depth, and re-search them at full depth only if they turn out
+    to improve on alpha (or beta, at minimizing nodes). Mobility extensions
+    search one ply deeper below positions where either player is down to
+    very few legal moves, because these forcing lines decide isolation games.
+
+    Parameters
+    ----------
+    full_depth_moves : int (optional)
+        The number of moves at each node that are always searched to full
+        depth.
+
+    reduction_depth : int (optional)
+        The minimum remaining depth at which late moves are reduced.
+
+    reduction : int (optional)
+        The number of plies removed from the search depth of a late move.
+
+    extension_mobility : int (optional)
+        Positions where either player has at least one and at most this many
+        legal moves are extended by one ply. Set to 0 to disable extensions.
+
+    max_extensions : int (optional)
+        The maximum number of extensions along a single search path.
+    """
+    def __init__(self, full_depth_moves=3, reduction_depth=3, reduction=1,
+                 extension_mobility=2, max_extensions=2):
+        self.full_depth_moves = full_depth_moves
+        self.reduction_depth = reduction_depth
+        self.reduction = reduction
+        self.extension_mobility = extension_mobility
+        self.max_extensions = max_extensions
+
+    def depth_reduction(self, move_index, depth):
+        """ Return the number of plies to remove from the search of the
+        move at position `move_index` in the move list of a node with
+        `depth` plies left to search.
+        """
+        if move_index < self.full_depth_moves or depth < self.reduction_depth:
+            return 0
+        return min(self.reduction, depth - 1)
+
+    def is_forcing(self, game, extensions):
+        """ Return True if the search below the given position should be
+        extended by one ply.
+        """
+        if extensions >= self.max_extensions:
+            return False
+
+        own_moves = len(game.get_legal_moves())
+        if not own_moves:
+            return False
+        opp_moves = len(game.get_legal_moves(game.inactive_player))
+        return (own_moves <= self.extension_mobility or
+                0 < opp_moves <= self.extension_mobility)
+
+
+class TimeManager:
+    """Time management for the iterative deepening loop of `AlphaBetaPlayer`.
+
+    The manager records how long each completed iteration took and predicts
+    the cost of the next one from the effective branching factor, i.e. the
+    ratio between the times of consecutive iterations. An iteration that is
+    not predicted to finish within the remaining budget is skipped instead of
+    being started and thrown away on timeout.
+
+    When a total game clock is given, the manager also keeps track of the
+    time used so far in the current game and spreads the rest over the moves
+    it expects to play, giving more time to the middle game than to the
+    opening and the endgame.
+
+    Parameters
+    ----------
+    safety : float (optional)
+        Factor applied to the predicted cost of the next iteration.
+
+    default_ebf : float (optional)
+        Branching factor assumed until two iterations have been timed.
+
+    max_ebf : float (optional)
+        Upper bound for the estimated branching factor.
+
+    game_time : float (optional)
+        Total time (in milliseconds) available to the player for a whole
+        game, or None if only the per-move limit applies.
+
+    phase_weights : (float, float, float) (optional)
+        Budget multipliers for the opening, middle game and endgame, i.e.
+        the thirds of the board filled so far.
+    """
+    def __init__(self, safety=1.2, default_ebf=4., max_ebf=8., game_time=None,
+                 phase_weights=(0.8, 1.3, 1.0)):
+        self.safety = safety
+        self.default_ebf = default_ebf
+        self.max_ebf = max_ebf
+        self.game_time = game_time
+        self.phase_weights = phase_weights
+        self.iterations = []
+        self.game_time_used = 0.
+        self.budget = float("inf")
+        self._move_start = 0.
+        self._last_move_count = None
+        self._max_depth = 0
+
+    def start_move(self, game, time_left):
+        """ Reset the iteration history and compute the time budget (in
+        milliseconds) for the move about to be searched.
+        """
+        if self._last_move_count is None or game.move_count < self._last_move_count:
+            self.game_time_used = 0.  # a new game has started
+        self._last_move_count = game.move_count
+
+        self.iterations = []
+        self._move_start = time_left()
+        blank_spaces = len(game.get_blank_spaces())
+        self._max_depth = blank_spaces
+        self.budget = float("inf")
+
+        if self.game_time is not None:
+            remaining = max(self.game_time - self.game_time_used, 0.)
+            expected_moves = max(blank_spaces // 4, 2)
+            filled = 1. - blank_spaces / float(game.geometry.size)
+            weight = self.phase_weights[min(int(3 * filled), 2)]
+            self.budget = weight * remaining / expected_moves
+        return self.budget
+
+    def end_move(self, time_left):
+        """ Charge the time spent on the current move to the game clock. """
+        self.game_time_used += self._move_start - time_left()
+
+    def record(self, depth, elapsed):
+        """ Record the time (in milliseconds) taken by a completed
+        iteration to the given depth.
+        """
+        self.iterations.append((depth, elapsed))
+
+    def effective_branching_factor(self):
+        """ Estimate the effective branching factor from the times of the
+        last completed iterations.
+        """
+        if len(self.iterations) < 2 or self.iterations[-2][1] <= 0:
+            return self.default_ebf
+        ratio = self.iterations[-1][1] / self.iterations[-2][1]
+        return min(max(ratio, 1.), self.max_ebf)
+
+    def predict(self):
+        """ Predict the time (in milliseconds) of the next iteration. """
+        if not self.iterations:
+            return 0.
+        return self.iterations[-1][1] * self.effective_branching_factor()
+
+    def can_start(self, depth, time_left, threshold=0.):
+        """ Return True if an iteration to the given depth is expected to
+        finish within both the move time limit and the move budget.
+        """
+        if not self.iterations:
+            return True  # always complete one iteration to have a move
+        if depth > self._max_depth:
+            return False  # the whole remaining game tree has been searched
+        available = min(time_left() - threshold,
+                        self.budget - (self._move_start - time_left()))
+        return self.safety * self.predict() < available
+
+
 class AlphaBetaPlayer(IsolationPlayer):
     """Game-playing agent that chooses a move using iterative deepening minimax
     search with alpha-beta pruning. You must finish and test this player to
     make sure it returns a good move before the search time limit expires.
+
+    Parameters
+    ----------
+    selective : SelectiveSearch (optional)
+        Enables late move reductions and mobility extensions with the given
+        configuration. Every move is searched to the same depth if None.
+
+    time_manager : TimeManager (optional)
+        Decides whether to start each new iteration of iterative deepening.
+        If None, the search keeps deepening until it times out.
+
+    tablebase : `isolation.tablebase.Tablebase` (optional)
+        A solved table probed before searching; positions it covers are
+        played perfectly without a search.
+
+    transposition_table : `isolation.transposition.TranspositionTable` (optional)
+        Caches search results by position. Players that share a table must
+        use the same score function.
+
+    proof_search : `isolation.proof_number.ProofNumberSearch` (optional)
+        Tries to prove a forced win before searching once the mobility of
+        the position drops below its threshold, and plays proven wins
+        without a search.
     """
+    def __init__(self, search_depth=3, score_fn=custom_score, timeout=10.,
+                 selective=None, time_manager=None, tablebase=None,
+                 transposition_table=None, proof_search=None):
+        IsolationPlayer.__init__(self, search_depth, score_fn, timeout)
+        self.selective = selective
+        self.time_manager = time_manager
+        self.tablebase = tablebase
+        self.transposition_table = transposition_table
+        self.proof_search = proof_search
+        self.search_stats = {}
+        self.root_move_count = None
+        self._pv_move = None
+        self._root_best = None
 
     def get_move(self, game, time_left):
         """Search for the best move from the available legal moves and return a
@@ -396,25 +745,75 @@ class AlphaBetaPlayer(IsolationPlayer):
             (-1, -1) if there are no available legal moves.
         """
         self.time_left = time_left
-
+        # Start the clock before the tablebase and proof searches so that
+        # their time is charged to the move budget and the game clock too
+        if self.time_manager is not None:
+            self.time_manager.start_move(game, time_left)
+        try:
+            return self._get_move(game, time_left)
+        finally:
+            if self.time_manager is not None:
+                self.time_manager.end_move(time_left)
+
+    def _get_move(self, game, time_left):
+        """ Body of `get_move`, run between the `TimeManager.start_move` and
+        `TimeManager.end_move` calls.
+        """
         # Initialize the best move so that this function returns something
         # in case the search fails due to timeout
         best_move = (-1, -1)
+        # The player may be reused across positions: forget the root results
+        # of the previous one
+        self._pv_move = None
+        self._root_best = None
+
+        if self.tablebase is not None:
+            table_move = self.tablebase.best_move(game)
+            if table_move is not None:
+                self.search_stats = {"depth": 0, "iteration_ms": [], "tablebase": True}
+                return table_move
+
+        if self.proof_search is not None:
+            proof_move = self.proof_search.winning_move(game, time_left)
+            if proof_move is not None:
+                self.search_stats = {"depth": 0, "iteration_ms": [], "proof": True}
+                return proof_move
+
+        depth = 1
+        max_depth = len(game.get_blank_spaces())
+        self.search_stats = {"depth": 0, "iteration_ms": []}
+
+        while depth <= max_depth:
+            if (self.time_manager is not None and
+                    not self.time_manager.can_start(depth, time_left, self.TIMER_THRESHOLD)):
+                break
 
-        depth = 0
-
-        while True:
+            iteration_start = time_left()
+            self._pv_move = best_move
             try:
                 # The try/except block will automatically catch the exception
                 # raised when the timer is about to expire.
                 best_move = self.alphabeta(game, depth)
 
             except SearchTimeout:
+                # The root searches the previous best move first, so any root
+                # result of the unfinished iteration either confirms it or
+                # beat it at the deeper depth
+                if self._root_best is not None and self._root_best[0] != best_move:
+                    best_move, self.search_stats["score"] = self._root_best
+                    self.search_stats["partial_depth"] = depth
                 break
 
+            elapsed = iteration_start - time_left()
+            self.search_stats["depth"] = depth
+            self.search_stats["iteration_ms"].append(elapsed)
+            if self.time_manager is not None:
+                self.time_manager.record(depth, elapsed)
+
             depth += 1
 
-        # Return the best move from the last completed search iteration
+        # Return the best move from the last completed search iteration, or
+        # a better one found by the unfinished iteration
         return best_move
 
 
@@ -465,50 +864,174 @@ class AlphaBetaPlayer(IsolationPlayer):
                 each helper function or else your agent will timeout during
                 testing.
         """
+        # Reset before the timer check so that a timeout on entry never
+        # reports the root result of an earlier search
+        self._root_best = None
         if self.time_left() < self.TIMER_THRESHOLD:
             raise SearchTimeout()
 
+        self.root_move_count = game.move_count
         best_score = float("-inf")
         best_move = (-1, -1)
+        alpha_orig = alpha
 
-        current_depth = 0
+        _, moves = self.probe_table(game, depth, alpha, beta, root=True)
+        if self._pv_move in moves:
+            moves.remove(self._pv_move)
+            moves.insert(0, self._pv_move)
 
-        for m in game.get_legal_moves():
-            v = self.min_value(game.forecast_move(m), current_depth + 1, alpha, beta)
-            if v > best_score:
+        for m in moves:
+            v = self.min_value(game.forecast_move(m), depth - 1, alpha, beta)
+            if v > best_score or best_move == (-1, -1):
                 best_score = v
                 best_move = m
+                self._root_best = (best_move, best_score)
             if v >= beta:
                 break
             alpha = max(alpha, v)
+
+        if self.transposition_table is not None and best_move != (-1, -1):
+            self.store_table(game, depth, alpha_orig, beta, best_score, best_move)
+        self.search_stats["score"] = best_score
         return best_move
 
-    def max_value(self, game, depth, alpha, beta):
+    def max_value(self, game, depth, alpha, beta, extensions=0):
+        """ Return the value of a maximizing node with `depth` plies left
+        to search.
+        """
         if self.time_left() < self.TIMER_THRESHOLD:
             raise SearchTimeout()
 
-        if self.cutoff_test(game, depth):
+        if depth <= 0 or self.terminal_test(game):
             return self.score(game, self)
 
+        cached, moves = self.probe_table(game, depth, alpha, beta)
+        if cached is not None:
+            return cached
+
+        alpha_orig = alpha
         v = float("-inf")
-        for m in game.get_legal_moves():
-            v = max(v, self.min_value(game.forecast_move(m), depth + 1, alpha, beta))
+        best_move = None
+        for i, m in enumerate(moves):
+            child = game.forecast_move(m)
+            if self.selective is None:
+                child_v = self.min_value(child, depth - 1, alpha, beta)
+            else:
+                child_v = self.selective_value(child, i, depth, alpha, beta,
+                                               extensions, True)
+            if child_v > v or best_move is None:
+                v, best_move = child_v, m
             if v >= beta:
                 break
             alpha = max(alpha, v)
+
+        if self.transposition_table is not None:
+            self.store_table(game, depth, alpha_orig, beta, v, best_move)
         return v
 
-    def min_value(self, game, depth, alpha, beta):
+    def min_value(self, game, depth, alpha, beta, extensions=0):
+        """ Return the value of a minimizing node with `depth` plies left
+        to search.
+        """
         if self.time_left() < self.TIMER_THRESHOLD:
             raise SearchTimeout()
 
-        if self.cutoff_test(game, depth):
+        if depth <= 0 or self.terminal_test(game):
             return self.score(game, self)  # by Assumption 2
 
+        cached, moves = self.probe_table(game, depth, alpha, beta)
+        if cached is not None:
+            return cached
+
+        beta_orig = beta
         v = float("inf")
-        for m in game.get_legal_moves():
-            v = min(v, self.max_value(game.forecast_move(m), depth + 1, alpha, beta))
+        best_move = None
+        for i, m in enumerate(moves):
+            child = game.forecast_move(m)
+            if self.selective is None:
+                child_v = self.max_value(child, depth - 1, alpha, beta)
+            else:
+                child_v = self.selective_value(child, i, depth, alpha, beta,
+                                               extensions, False)
+            if child_v < v or best_move is None:
+                v, best_move = child_v, m
             if v <= alpha:
                 break
             beta = min(beta, v)
+
+        if self.transposition_table is not None:
+            self.store_table(game, depth, alpha, beta_orig, v, best_move)
         return v
+
+    def table_key(self, game):
+        """ Return the transposition table key of a position searched on
+        behalf of this player.
+        """
+        key = game.zobrist_key()
+        if game._player_2 is self:
+            key ^= PERSPECTIVE_KEY
+        return key
+
+    def probe_table(self, game, depth, alpha, beta, root=False):
+        """ Look the position up in the transposition table.
+
+        Returns
+        -------
+        (float or None, list<(int, int)>)
+            The stored value if it is deep enough to decide the node within
+            the (alpha, beta) window (never at the root), and the legal
+            moves with the stored best move first.
+        """
+        moves = game.get_legal_moves()
+        if self.transposition_table is None:
+            return None, moves
+
+        entry = self.transposition_table.probe(self.table_key(game))
+        if entry is None:
+            return None, moves
+
+        entry_depth, flag, value, move_idx = entry
+        if not root and entry_depth >= depth:
+            if (flag == EXACT or (flag == LOWER and value >= beta) or
+                    (flag == UPPER and value <= alpha)):
+                return value, moves
+
+        if move_idx is not None:
+            move = game.geometry.cells[move_idx]
+            if move in moves:
+                moves.remove(move)
+                moves.insert(0, move)
+        return None, moves
+
+    def store_table(self, game, depth, alpha, beta, value, move):
+        """ Store the value of a node searched with the (alpha, beta)
+        window in the transposition table.
+        """
+        if value <= alpha:
+            flag = UPPER
+        elif value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        move_idx = None if move is None else game.geometry.cell_index[move]
+        self.transposition_table.store(self.table_key(game), depth, flag, value, move_idx)
+
+    def selective_value(self, child, move_index, depth, alpha, beta,
+                        extensions, maximizing):
+        """ Return the value of the child reached by the move at position
+        `move_index` of a node with `depth` plies left, applying the
+        mobility extensions and late move reductions of `self.selective`.
+        """
+        child_value = self.min_value if maximizing else self.max_value
+
+        if self.selective.is_forcing(child, extensions):
+            return child_value(child, depth, alpha, beta, extensions + 1)
+
+        reduction = self.selective.depth_reduction(move_index, depth)
+        if reduction:
+            v = child_value(child, depth - 1 - reduction, alpha, beta, extensions)
+            # re-search at full depth only if the reduced search beats the bound
+            if (maximizing and v <= alpha) or (not maximizing and v >= beta):
+                return v
+
+        return child_value(child, depth - 1, alpha, beta, extensions)
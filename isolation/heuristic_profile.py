@@ -0,0 +1,133 @@
+"""Compare the cost of heuristics with the strength they buy.
+
+A more expensive evaluation function costs search depth, so win rate alone is
+a poor guide for choosing between heuristics on given hardware. For each
+tournament test agent this script measures, on a corpus of positions:
+
+  - the cost of one evaluation of its score function in microseconds;
+  - the average depth its `AlphaBetaPlayer` completes within the move time
+    limit of the tournament;
+
+and combines them with the agent's win rate from the tournament result
+cache (see `tournament.ResultCache`), reporting the win rate per microsecond
+of evaluation cost.
+
+Usage:
+
+    python tournament.py                # fills .tournament_cache.json
+    python heuristic_profile.py --positions 200
+"""
+import argparse
+import random
+import timeit
+
+from isolation import Board
+from isolation.adjudication import PartitionAdjudicator
+from tournament import (CACHE_FILE, ITERATIONS, NUM_MATCHES, TIME_LIMIT, ResultCache,
+                        make_cpu_agents, make_test_agents)
+
+
+def make_corpus(num_positions, min_plies=4, max_plies=30, seed=0, width=7, height=7):
+    """Return positions reached by random play as `Board.to_bytes`
+    encodings, keeping only positions where the side to move can move.
+    """
+    rng = random.Random(seed)
+    corpus = []
+    while len(corpus) < num_positions:
+        board = Board("Player 1", "Player 2", width, height)
+        for _ in range(rng.randint(min_plies, max_plies)):
+            moves = board.get_legal_moves()
+            if not moves:
+                break
+            board.apply_move(rng.choice(sorted(moves)))
+        if board.get_legal_moves():
+            corpus.append(board.to_bytes())
+    return corpus
+
+
+def evaluation_cost(score_fn, corpus, repeat=5):
+    """Return the mean time of one evaluation in microseconds, taking the
+    fastest of `repeat` passes over the corpus.
+    """
+    boards = [Board.from_bytes(data, "Player 1", "Player 2") for data in corpus]
+    best = float("inf")
+    for _ in range(repeat):
+        start = timeit.default_timer()
+        for board in boards:
+            score_fn(board, board.active_player)
+        best = min(best, timeit.default_timer() - start)
+    return 1e6 * best / len(boards)
+
+
+def search_depth(player, corpus, time_limit=TIME_LIMIT):
+    """Return the mean depth of the last iteration `player` completes
+    within `time_limit` milliseconds over the corpus.
+    """
+    depths = []
+    for data in corpus:
+        board = Board.from_bytes(data, active=player)
+        start = timeit.default_timer()
+        player.get_move(board, lambda: time_limit - 1000 * (timeit.default_timer() - start))
+        depths.append(player.search_stats["depth"])
+    return sum(depths) / len(depths)
+
+
+def profile(test_agents, corpus, depth_corpus, cache=None, cpu_agents=None,
+            num_matches=NUM_MATCHES, iterations=ITERATIONS, time_limit=TIME_LIMIT):
+    """Profile each test agent.
+
+    Returns
+    -------
+    list<dict>
+        For each agent: "name", "us_per_eval", "depth", "win_rate" (None
+        if the cache holds no results for it) and "win_rate_per_us".
+    """
+    rows = []
+    for agent in test_agents:
+        record = None
+        if cache is not None:
+            record = cache.record(cpu_agents, agent, num_matches, iterations)
+        cost = evaluation_cost(agent.player.score, corpus)
+        win_rate = None if record is None else record[0] / record[1]
+        rows.append({
+            "name": agent.name,
+            "us_per_eval": cost,
+            "depth": search_depth(agent.player, depth_corpus, time_limit),
+            "win_rate": win_rate,
+            "win_rate_per_us": None if win_rate is None else win_rate / cost})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--positions", type=int, default=500,
+                        help="Number of corpus positions used to time evaluations.")
+    parser.add_argument("--depth-positions", type=int, default=50,
+                        help="Number of corpus positions searched to measure depth.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", default=CACHE_FILE,
+                        help="Tournament result cache (default: {}).".format(CACHE_FILE))
+    parser.add_argument("--adjudicate", action="store_true",
+                        help="Read the results of a tournament run with --adjudicate.")
+    args = parser.parse_args(argv)
+
+    adjudicator = PartitionAdjudicator() if args.adjudicate else None
+    cache = ResultCache(args.cache, adjudicator)
+    corpus = make_corpus(args.positions, seed=args.seed)
+
+    rows = profile(make_test_agents(), corpus, corpus[:args.depth_positions],
+                   cache, make_cpu_agents())
+
+    print("{:<14}{:>10}{:>8}{:>10}{:>12}".format(
+        "Agent", "us/eval", "Depth", "Win rate", "Win %/us"))
+    for row in rows:
+        win_rate, per_us = "-", "-"
+        if row["win_rate"] is not None:
+            win_rate = "{:.1f}%".format(100 * row["win_rate"])
+            per_us = "{:.2f}".format(100 * row["win_rate_per_us"])
+        print("{:<14}{:>10.2f}{:>8.2f}{:>10}{:>12}".format(
+            row["name"], row["us_per_eval"], row["depth"], win_rate, per_us))
+
+
+if __name__ == "__main__":
+    main()
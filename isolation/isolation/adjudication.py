@@ -0,0 +1,87 @@
+"""
+Adjudicators end Isolation games whose result is already decided.
+
+An adjudicator is a callable that takes a `Board` and returns the player who
+is proven to win, or None if the game must go on. `Board.play` and
+`tournament.play_round` call it once per ply when one is supplied.
+"""
+from .movement import JumpTable
+
+
+class PartitionAdjudicator(object):
+    """Decide games in which the players can no longer reach each other.
+
+    Once no blank cell is reachable by both players, each player moves alone
+    in its own region and the game reduces to comparing the longest knight
+    paths the players can make there. The active player moves first, so it
+    wins exactly when its longest path is strictly longer than the
+    opponent's.
+
+    Longest paths are computed with a depth-first search limited to
+    `max_nodes` nodes per player. When the search is cut short, the best
+    path found is used as a lower bound and the size of the region as an
+    upper bound, and the game is only adjudicated if the bounds prove the
+    result.
+
+    Only boards whose movement rule is a leaper are adjudicated.
+
+    Parameters
+    ----------
+    max_nodes : int (optional)
+        The node budget for each longest path search.
+    """
+
+    def __init__(self, max_nodes=5000):
+        self.max_nodes = max_nodes
+
+    def __call__(self, board):
+        """Return the proven winner of the board, or None. """
+        loc_active = board.get_player_location(board.active_player)
+        loc_inactive = board.get_player_location(board.inactive_player)
+        if loc_active is None or loc_inactive is None:
+            return None
+
+        table = board.movement.table(board.width, board.height)
+        if not isinstance(table, JumpTable):
+            return None
+
+        geometry = board.geometry
+        blank = board.blank_mask()
+        start_active = geometry.cell_index[loc_active]
+        start_inactive = geometry.cell_index[loc_inactive]
+        region_active = table.reachable(1 << start_active, blank)
+        region_inactive = table.reachable(1 << start_inactive, blank)
+        if region_active & region_inactive:
+            return None
+
+        low_active, high_active = self.longest_path(
+            table.jumps, start_active, region_active)
+        low_inactive, high_inactive = self.longest_path(
+            table.jumps, start_inactive, region_inactive)
+
+        if low_active > high_inactive:
+            return board.active_player
+        if high_active <= low_inactive:
+            return board.inactive_player
+        return None
+
+    def longest_path(self, neighbours, start, region):
+        """Return lower and upper bounds on the number of moves a player at
+        `start` can make inside `region`; they are equal if the search
+        finished within the node budget.
+        """
+        upper = bin(region).count("1")
+        budget = [self.max_nodes]
+
+        def search(idx, free):
+            budget[0] -= 1
+            best = 0
+            for n in neighbours[idx]:
+                if budget[0] <= 0 or best == upper:
+                    break
+                if free >> n & 1:
+                    best = max(best, 1 + search(n, free & ~(1 << n)))
+            return best
+
+        lower = search(start, region)
+        return lower, (lower if budget[0] > 0 else upper)
@@ -0,0 +1,186 @@
+"""
+Run Isolation agents in their own processes.
+
+`AgentProcess` starts an agent in a separate process (optionally pinned to a
+CPU core) and acts as a local stand-in for it, so it can be passed to `Board`
+like any other player. Each call to `get_move` sends the position and its
+movement rule over a pipe and waits for the reply, while the referee measures
+the move latency on its own clock. The agent object lives as long as the process, so it keeps any
+tables it builds from one game to the next.
+
+Example:
+
+    with AgentProcess(AlphaBetaPlayer, cpu=1) as p1, \
+            AgentProcess(AlphaBetaPlayer, cpu=2) as p2:
+        winner, history, outcome = Board(p1, p2).play()
+"""
+import multiprocessing
+import os
+import timeit
+import traceback
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .isolation import Board, TIME_LIMIT_MILLIS
+
+_MOVE = "move"
+_CLOSE = "close"
+
+
+def _time_millis():
+    return 1000 * timeit.default_timer()
+
+
+def _serve(conn, factory, cpu, margin):
+    """Agent process main loop: answer move requests until told to close."""
+    if cpu is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {cpu})
+
+    agent = factory()
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message[0] == _CLOSE:
+            break
+
+        _, seq, data, movement, time_limit = message
+        move_start = _time_millis()
+        time_left = lambda: time_limit - margin - (_time_millis() - move_start)
+        try:
+            board = Board.from_bytes(data, movement=movement, active=agent)
+            move = agent.get_move(board, time_left)
+        except Exception:
+            conn.send((seq, None, traceback.format_exc()))
+            continue
+        conn.send((seq, move, None))
+    conn.close()
+
+
+class AgentProcess(object):
+    """A player that forwards `get_move` to an agent running in a separate
+    process.
+
+    Parameters
+    ----------
+    factory : callable
+        Called without arguments in the new process to construct the agent,
+        e.g. a player class or a `functools.partial` of one. It must be
+        picklable unless the platform starts processes by forking.
+
+    cpu : int (optional)
+        The CPU core to pin the agent process to, if the platform supports
+        CPU affinity.
+
+    margin : float (optional)
+        Milliseconds the agent's own clock subtracts from the time limit to
+        cover the round trip through the pipe.
+
+    grace : float (optional)
+        Milliseconds to keep waiting for a reply after the time limit has
+        expired before giving up on the move.
+
+    Attributes
+    ----------
+    latencies : list<float>
+        The move latency in milliseconds for each move, measured by the
+        referee from sending the position to receiving the reply.
+    """
+
+    def __init__(self, factory, cpu=None, margin=1., grace=50.):
+        self.cpu = cpu
+        self.grace = grace
+        self.latencies = []
+        self._seq = 0
+        self._conn, child_conn = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_serve, args=(child_conn, factory, cpu, margin), daemon=True)
+        self._process.start()
+        child_conn.close()
+
+    def get_move(self, game, time_left):
+        """Send the position to the agent process and wait for its move.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            The current game state, with this object as the active player.
+
+        time_left : callable
+            A function that returns the number of milliseconds left in the
+            current turn.
+
+        Returns
+        -------
+        (int, int) or None
+            The move chosen by the agent, or None if it did not reply in
+            time.
+        """
+        self._seq += 1
+        send_time = _time_millis()
+        time_limit = time_left()
+        self._conn.send((_MOVE, self._seq, game.to_bytes(), game.movement, time_limit))
+
+        deadline = None
+        if time_limit != float("inf"):
+            deadline = send_time + max(time_limit, 0.) + self.grace
+
+        while True:
+            timeout = None if deadline is None else max(deadline - _time_millis(), 0.) / 1000.
+            if not self._conn.poll(timeout):
+                self.latencies.append(_time_millis() - send_time)
+                return None
+
+            seq, move, error = self._conn.recv()
+            if seq != self._seq:
+                continue  # late reply to a move that already timed out
+            self.latencies.append(_time_millis() - send_time)
+            if error is not None:
+                raise RuntimeError("Agent process failed:\n{}".format(error))
+            return move
+
+    def close(self):
+        """Stop the agent process."""
+        if self._process.is_alive():
+            try:
+                self._conn.send((_CLOSE,))
+            except (BrokenPipeError, OSError):
+                pass
+            self._process.join(timeout=1.)
+            if self._process.is_alive():
+                self._process.terminate()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def play_parallel(games, time_limit=TIME_LIMIT_MILLIS, max_workers=None):
+    """Play several games at once and return their results in order.
+
+    The referee work is light, so the games run in threads of this process
+    while the agents compute in their own processes. An `AgentProcess` can
+    only play one game at a time, so every game must use its own agents.
+
+    Parameters
+    ----------
+    games : list<`isolation.Board`>
+        Boards whose players are `AgentProcess` instances.
+
+    time_limit : numeric (optional)
+        The time limit per move in milliseconds.
+
+    max_workers : int (optional)
+        The maximum number of games played at the same time.
+
+    Returns
+    -------
+    list<(player, list<[(int, int),]>, str)>
+        The result of `Board.play` for each game.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers or len(games) or 1) as executor:
+        return list(executor.map(lambda game: game.play(time_limit=time_limit), games))
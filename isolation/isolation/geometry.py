@@ -0,0 +1,106 @@
+"""
+Precomputed lookup tables for an Isolation board of a given size.
+
+Everything in a `Geometry` depends only on the board width and height, so it
+is built once per (width, height) by `get_geometry` and shared by every
+`Board` (and every board copy) of that size. Cells are numbered the same way
+as `Board._board_state`, i.e. index = row + column * height.
+
+Sets of cells are also handled as bitboards: Python ints with bit `idx` set
+for each cell index in the set. A move by (dr, dc) adds dr + dc * height to
+the cell index, so `Geometry.direction_shifts` gives the masked shifts that
+move a whole set at once; the move tables of `isolation.movement` build
+their bitboard queries from them.
+"""
+import random
+
+from functools import lru_cache
+
+
+class Geometry(object):
+    """Lookup tables shared by all boards with the same dimensions.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    Attributes
+    ----------
+    size : int
+        The number of cells on the board.
+
+    cells : tuple<(int, int)>
+        The (row, column) coordinates of each cell index.
+
+    cell_index : dict<(int, int), int>
+        The inverse of `cells`.
+
+    full_mask : int
+        The bitboard of all cells.
+
+    centrality : tuple<float>
+        The centrality weight of each cell index, i.e. the product of the
+        distances to opposite edges summed over both axes. It is largest in
+        the middle of the board and zero in the corners.
+
+    zobrist_cells : tuple<int>
+        A random 64-bit key for each blocked cell index.
+
+    zobrist_locations : (tuple<int>, tuple<int>)
+        A random 64-bit key for each cell index occupied by player 1 and by
+        player 2.
+
+    zobrist_side : int
+        The random 64-bit key of positions with player 2 to move.
+
+    zobrist_base : int
+        The non-zero random 64-bit key of the empty board with player 1 to
+        move, which every key starts from. A key of 0 would match the
+        all-zero words of an empty transposition table slot.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.cells = tuple((idx % height, idx // height) for idx in range(self.size))
+        self.cell_index = {cell: idx for idx, cell in enumerate(self.cells)}
+        self.full_mask = (1 << self.size) - 1
+
+        w, h = (width - 1) / 2., (height - 1) / 2.
+        self.centrality = tuple(y * (2 * h - y) + x * (2 * w - x)
+                                for y, x in self.cells)
+
+        # seeded by the dimensions so keys are identical in every process
+        rng = random.Random("isolation-{}x{}".format(width, height))
+        self.zobrist_cells = tuple(rng.getrandbits(64) for _ in range(self.size))
+        self.zobrist_locations = tuple(tuple(rng.getrandbits(64) for _ in range(self.size))
+                                       for _ in range(2))
+        self.zobrist_side = rng.getrandbits(64)
+        self.zobrist_base = rng.getrandbits(64) or 1
+
+    def direction_shifts(self, directions):
+        """Return the bit shifts that move a bitboard by each (dr, dc) of
+        `directions`, as two tuples of (shift, mask of the cells the move
+        keeps on the board): the left shifts and the right shifts.
+        """
+        left, right = [], []
+        for dr, dc in directions:
+            shift = dr + dc * self.height
+            valid = sum(1 << idx for idx, (r, c) in enumerate(self.cells)
+                        if 0 <= r + dr < self.height and 0 <= c + dc < self.width)
+            if shift > 0:
+                left.append((shift, valid))
+            else:
+                right.append((-shift, valid))
+        return tuple(left), tuple(right)
+
+
+@lru_cache(maxsize=None)
+def get_geometry(width, height):
+    """Return the shared `Geometry` for a board of the given dimensions."""
+    return Geometry(width, height)
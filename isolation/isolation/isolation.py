@@ -1,18 +1,37 @@
 """
 This file contains the `Board` class, which implements the rules for the
 game Isolation as described in lecture, modified so that the players move
-like knights in chess rather than queens.
+like knights in chess rather than queens. Other movement rules, including
+the original queen moves, can be selected with the `movement` argument (see
+`isolation.movement`).
 
 You MAY use and modify this class, however ALL function signatures must
 remain compatible with the defaults provided, and none of your changes will
 be available to project reviewers.
 """
 import random
+import struct
 import timeit
 from copy import copy
 
+from .geometry import get_geometry
+from .movement import KNIGHT
+
 TIME_LIMIT_MILLIS = 150
 
+# width, height, move count, initiative, player 1 and player 2 cell index
+_POSITION_HEADER = struct.Struct("<HHHBHH")
+_NO_LOCATION = 0xFFFF
+
+
+class _Opponent(object):
+    """Placeholder for a side of a board rebuilt by `Board.from_bytes`
+    without a player object of its own.
+    """
+
+    def get_move(self, game, time_left):
+        raise RuntimeError("Only the side to move of a rebuilt position can move.")
+
 
 class Board(object):
     """Implement a model for the game Isolation assuming each player moves like
@@ -33,14 +52,20 @@ class Board(object):
 
     height : int (optional)
         The number of rows that the board should have.
+
+    movement : `isolation.movement.Movement` (optional)
+        The movement rule of both players; knight moves if None.
     """
     BLANK = 0
     NOT_MOVED = None
 
-    def __init__(self, player_1, player_2, width=7, height=7):
+    def __init__(self, player_1, player_2, width=7, height=7, movement=None):
         self.width = width
         self.height = height
         self.move_count = 0
+        self._geometry = get_geometry(width, height)
+        self._movement = KNIGHT if movement is None else movement
+        self._move_table = self._movement.table(width, height)
         self._player_1 = player_1
         self._player_2 = player_2
         self._active_player = player_1
@@ -51,10 +76,45 @@ class Board(object):
         self._board_state = [Board.BLANK] * (width * height + 3)
         self._board_state[-1] = Board.NOT_MOVED
         self._board_state[-2] = Board.NOT_MOVED
+        self._zobrist_key = self._geometry.zobrist_base
+        self._blocked_mask = 0
 
     def hash(self):
         return str(self._board_state).__hash__()
 
+    def zobrist_key(self):
+        """Return a 64-bit key of the position (blocked cells, player
+        locations and side to move) that is the same in every process.
+        The key is updated incrementally by `apply_move`.
+        """
+        return self._zobrist_key
+
+    def _compute_zobrist_key(self):
+        geometry = self._geometry
+        board_state = self._board_state
+        key = geometry.zobrist_base
+        for idx in range(geometry.size):
+            if board_state[idx]:
+                key ^= geometry.zobrist_cells[idx]
+        for slot, loc in enumerate((board_state[-1], board_state[-2])):
+            if loc is not Board.NOT_MOVED:
+                key ^= geometry.zobrist_locations[slot][loc]
+        if self._active_player == self._player_2:
+            key ^= geometry.zobrist_side
+        return key
+
+    @property
+    def geometry(self):
+        """The precomputed `isolation.geometry.Geometry` lookup tables shared
+        by all boards with the same dimensions.
+        """
+        return self._geometry
+
+    @property
+    def movement(self):
+        """The `isolation.movement.Movement` rule of the players. """
+        return self._movement
+
     @property
     def active_player(self):
         """The object registered as the player holding initiative in the
@@ -92,13 +152,94 @@ class Board(object):
 
     def copy(self):
         """ Return a deep copy of the current board. """
-        new_board = Board(self._player_1, self._player_2, width=self.width, height=self.height)
+        new_board = Board(self._player_1, self._player_2, width=self.width,
+                          height=self.height, movement=self._movement)
         new_board.move_count = self.move_count
         new_board._active_player = self._active_player
         new_board._inactive_player = self._inactive_player
         new_board._board_state = copy(self._board_state)
+        new_board._zobrist_key = self._zobrist_key
+        new_board._blocked_mask = self._blocked_mask
         return new_board
 
+    def to_bytes(self):
+        """Encode the position (blocked cells, player locations, side to move
+        and move count) without the player objects.
+
+        Returns
+        -------
+        bytes
+            A compact encoding that `Board.from_bytes` turns back into a board.
+        """
+        board_state = self._board_state
+        blocked = 0
+        for idx in range(self._geometry.size):
+            if board_state[idx]:
+                blocked |= 1 << idx
+        loc1, loc2 = board_state[-1], board_state[-2]
+        header = _POSITION_HEADER.pack(
+            self.width, self.height, self.move_count,
+            int(self._active_player == self._player_2) | board_state[-3] << 1,
+            _NO_LOCATION if loc1 is Board.NOT_MOVED else loc1,
+            _NO_LOCATION if loc2 is Board.NOT_MOVED else loc2)
+        return header + blocked.to_bytes((self._geometry.size + 7) // 8, "little")
+
+    @classmethod
+    def from_bytes(cls, data, player_1=None, player_2=None, movement=None, active=None):
+        """Rebuild a board encoded by `Board.to_bytes` for the given players.
+
+        A side left without a player object is bound to its own placeholder
+        that raises if it is asked to move, so the two sides always stay
+        distinct.
+
+        Parameters
+        ----------
+        data : bytes
+            The output of `Board.to_bytes`.
+
+        player_1 : object (optional)
+            The player object to bind as the first player.
+
+        player_2 : object (optional)
+            The player object to bind as the second player.
+
+        movement : `isolation.movement.Movement` (optional)
+            The movement rule of the game, which is not encoded; knight
+            moves if None.
+
+        active : object (optional)
+            A player object to bind to the side to move, replacing the
+            player given for that side.
+
+        Returns
+        -------
+        isolation.Board
+            A board in the encoded position.
+        """
+        width, height, move_count, flags, loc1, loc2 = _POSITION_HEADER.unpack_from(data)
+        if active is not None:
+            if flags & 1:
+                player_2 = active
+            else:
+                player_1 = active
+        if player_1 is None:
+            player_1 = _Opponent()
+        if player_2 is None:
+            player_2 = _Opponent()
+        board = cls(player_1, player_2, width=width, height=height, movement=movement)
+        blocked = int.from_bytes(data[_POSITION_HEADER.size:], "little")
+        board_state = [blocked >> idx & 1 for idx in range(board._geometry.size)]
+        board_state.append(flags >> 1)
+        board_state.append(Board.NOT_MOVED if loc2 == _NO_LOCATION else loc2)
+        board_state.append(Board.NOT_MOVED if loc1 == _NO_LOCATION else loc1)
+        board._board_state = board_state
+        board.move_count = move_count
+        if flags & 1:
+            board._active_player, board._inactive_player = player_2, player_1
+        board._zobrist_key = board._compute_zobrist_key()
+        board._blocked_mask = blocked
+        return board
+
     def forecast_move(self, move):
         """Return a deep copy of the current game with an input move applied to
         advance the game one ply.
@@ -139,8 +280,57 @@ class Board(object):
     def get_blank_spaces(self):
         """Return a list of the locations that are still available on the board.
         """
-        return [(i, j) for j in range(self.width) for i in range(self.height)
-                if self._board_state[i + j * self.height] == Board.BLANK]
+        cells = self._geometry.cells
+        board_state = self._board_state
+        return [cells[idx] for idx in range(self._geometry.size)
+                if board_state[idx] == Board.BLANK]
+
+    def blank_mask(self):
+        """Return the bitboard of the blank cells (see
+        `isolation.geometry`).
+        """
+        return self._geometry.full_mask & ~self._blocked_mask
+
+    def location_mask(self, player):
+        """Return the bitboard holding the cell of the specified player, or 0
+        if the player has not moved yet.
+        """
+        if player == self._player_1:
+            idx = self._board_state[-1]
+        elif player == self._player_2:
+            idx = self._board_state[-2]
+        else:
+            raise RuntimeError(
+                "Invalid player in location_mask: {}".format(player))
+        return 0 if idx is Board.NOT_MOVED else 1 << idx
+
+    def move_mask(self, player=None):
+        """Return the bitboard of the legal moves of the specified player
+        (the active player by default).
+        """
+        if player is None:
+            player = self.active_player
+        location = self.location_mask(player)
+        if not location:
+            return self.blank_mask()
+        return self._move_table.attacks(location, self.blank_mask())
+
+    def reachable_mask(self, player, max_moves=None):
+        """Return the bitboard of the blank cells the specified player could
+        reach in 1 to `max_moves` of its own moves (any number if None) if
+        the opponent stood still.
+        """
+        location = self.location_mask(player)
+        if not location:
+            return self.blank_mask()
+        return self._move_table.reachable(location, self.blank_mask(), max_moves)
+
+    def exclusive_mask(self, player, max_moves=None):
+        """Return the bitboard of the blank cells the specified player can
+        reach within `max_moves` moves and its opponent cannot.
+        """
+        return (self.reachable_mask(player, max_moves) &
+                ~self.reachable_mask(self.get_opponent(player), max_moves))
 
     def get_player_location(self, player):
         """Find the current location of the specified player on the board.
@@ -167,9 +357,7 @@ class Board(object):
         else:
             raise RuntimeError(
                 "Invalid player in get_player_location: {}".format(player))
-        w = idx // self.height
-        h = idx % self.height
-        return (h, w)
+        return self._geometry.cells[idx]
 
     def get_legal_moves(self, player=None):
         """Return the list of all legal moves for the specified player.
@@ -201,6 +389,14 @@ class Board(object):
         """
         idx = move[0] + move[1] * self.height
         last_move_idx = int(self.active_player == self._player_2) + 1
+        geometry = self._geometry
+        locations = geometry.zobrist_locations[last_move_idx - 1]
+        last_loc = self._board_state[-last_move_idx]
+        key = self._zobrist_key ^ geometry.zobrist_cells[idx] ^ locations[idx] ^ geometry.zobrist_side
+        if last_loc is not Board.NOT_MOVED:
+            key ^= locations[last_loc]
+        self._zobrist_key = key
+        self._blocked_mask |= 1 << idx
         self._board_state[-last_move_idx] = idx
         self._board_state[idx] = 1
         self._board_state[-3] ^= 1
@@ -248,17 +444,15 @@ class Board(object):
         return 0.
 
     def __get_moves(self, loc):
-        """Generate the list of possible moves for an L-shaped motion (like a
-        knight in chess).
+        """Generate the list of possible moves from a location under the
+        movement rule of the board (L-shaped knight moves by default).
         """
         if loc == Board.NOT_MOVED:
             return self.get_blank_spaces()
 
-        r, c = loc
-        directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
-                      (1, -2), (1, 2), (2, -1), (2, 1)]
-        valid_moves = [(r + dr, c + dc) for dr, dc in directions
-                       if self.move_is_legal((r + dr, c + dc))]
+        cells = self._geometry.cells
+        valid_moves = [cells[idx] for idx in self._move_table.moves(
+            self._board_state, loc[0] + loc[1] * self.height)]
         random.shuffle(valid_moves)
         return valid_moves
 
@@ -295,7 +489,7 @@ class Board(object):
 
         return out
 
-    def play(self, time_limit=TIME_LIMIT_MILLIS):
+    def play(self, time_limit=TIME_LIMIT_MILLIS, adjudicator=None):
         """Execute a match between the players by alternately soliciting them
         to select a move and applying it in the game.
 
@@ -305,12 +499,17 @@ class Board(object):
             The maximum number of milliseconds to allow before timeout
             during each turn.
 
+        adjudicator : callable (optional)
+            Called with the board before every ply; if it returns a player,
+            the game ends with that player as the winner (see
+            `isolation.adjudication`).
+
         Returns
         ----------
         (player, list<[(int, int),]>, str)
             Return multiple including the winning player, the complete game
             move history, and a string indicating the reason for losing
-            (e.g., timeout or invalid move).
+            (e.g., timeout, invalid move or adjudicated).
         """
         move_history = []
 
@@ -318,6 +517,11 @@ class Board(object):
 
         while True:
 
+            if adjudicator is not None:
+                winner = adjudicator(self)
+                if winner is not None:
+                    return winner, move_history, "adjudicated"
+
             legal_player_moves = self.get_legal_moves()
             game_copy = self.copy()
 
@@ -0,0 +1,207 @@
+"""
+Movement rules for Isolation variants.
+
+A movement rule decides which cells a player can move to. `Leaper` rules
+jump straight to the cells at fixed offsets (the knight of the standard
+game, the king, or any custom leaper); `Slider` rules move any number of
+cells along a direction until the edge of the board or a blocked cell (the
+queen of the original game, the rook and the bishop).
+
+Each rule builds a move table once per board size, like
+`isolation.geometry.Geometry`, and `isolation.Board` generates moves with the
+table of its rule: leapers through precomputed jump lists and sliders by
+scanning precomputed rays up to the first blocker. Tables also answer the
+bitboard queries (`attacks`, `reachable`) that heuristics use.
+
+Example:
+
+    board = Board(player_1, player_2, movement=QUEEN)
+"""
+from .geometry import get_geometry
+
+KNIGHT_DIRECTIONS = ((-2, -1), (-2, 1), (-1, -2), (-1, 2),
+                     (1, -2), (1, 2), (2, -1), (2, 1))
+KING_DIRECTIONS = ((-1, -1), (-1, 0), (-1, 1), (0, -1),
+                   (0, 1), (1, -1), (1, 0), (1, 1))
+ROOK_DIRECTIONS = ((-1, 0), (0, -1), (0, 1), (1, 0))
+BISHOP_DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+
+
+class MoveTable(object):
+    """Move generator of one movement rule on one board size. """
+
+    def moves(self, board_state, idx):
+        """Return the cell indices the player on cell `idx` can move to
+        in the given `Board._board_state`.
+        """
+        raise NotImplementedError
+
+    def attacks(self, mask, blank):
+        """Return the bitboard of the blank cells reachable in one move from
+        any cell of the bitboard `mask`, given the bitboard `blank` of blank
+        cells.
+        """
+        raise NotImplementedError
+
+    def reachable(self, mask, blank, max_moves=None):
+        """Return the bitboard of cells of `blank` reachable from any cell of
+        `mask` in 1 to `max_moves` moves (any number if None) through cells
+        of `blank`.
+        """
+        seen = 0
+        frontier = mask
+        moves = 0
+        while frontier and (max_moves is None or moves < max_moves):
+            frontier = self.attacks(frontier, blank) & ~seen
+            seen |= frontier
+            moves += 1
+        return seen
+
+
+class JumpTable(MoveTable):
+    """Precomputed jumps of a leaper.
+
+    Attributes
+    ----------
+    jumps : tuple<tuple<int>>
+        The cell indices reachable from each cell index, in the order of
+        the rule's offsets.
+    """
+
+    def __init__(self, geometry, offsets):
+        self.jumps = tuple(
+            tuple(geometry.cell_index[(r + dr, c + dc)] for dr, dc in offsets
+                  if 0 <= r + dr < geometry.height and 0 <= c + dc < geometry.width)
+            for r, c in geometry.cells)
+        self._left_shifts, self._right_shifts = geometry.direction_shifts(offsets)
+
+    def moves(self, board_state, idx):
+        return [n for n in self.jumps[idx] if not board_state[n]]
+
+    def attacks(self, mask, blank):
+        result = 0
+        for shift, valid in self._left_shifts:
+            result |= (mask & valid) << shift
+        for shift, valid in self._right_shifts:
+            result |= (mask & valid) >> shift
+        return result & blank
+
+
+class RayTable(MoveTable):
+    """Precomputed rays of a slider.
+
+    Attributes
+    ----------
+    rays : tuple<tuple<tuple<int>>>
+        For each cell index, the cell indices along each direction of the
+        rule, nearest first.
+    """
+
+    def __init__(self, geometry, directions):
+        rays = []
+        for r, c in geometry.cells:
+            cell_rays = []
+            for dr, dc in directions:
+                ray = []
+                y, x = r + dr, c + dc
+                while 0 <= y < geometry.height and 0 <= x < geometry.width:
+                    ray.append(geometry.cell_index[(y, x)])
+                    y, x = y + dr, x + dc
+                if ray:
+                    cell_rays.append(tuple(ray))
+            rays.append(tuple(cell_rays))
+        self.rays = tuple(rays)
+        self._left_shifts, self._right_shifts = geometry.direction_shifts(directions)
+
+    def moves(self, board_state, idx):
+        targets = []
+        for ray in self.rays[idx]:
+            for n in ray:
+                if board_state[n]:
+                    break
+                targets.append(n)
+        return targets
+
+    def attacks(self, mask, blank):
+        # flood each direction one step at a time, stopping at blocked cells
+        result = 0
+        for shift, valid in self._left_shifts:
+            ray = mask
+            while ray:
+                ray = ((ray & valid) << shift) & blank
+                result |= ray
+        for shift, valid in self._right_shifts:
+            ray = mask
+            while ray:
+                ray = ((ray & valid) >> shift) & blank
+                result |= ray
+        return result
+
+
+class Movement(object):
+    """A movement rule: builds and caches its move table per board size.
+
+    Parameters
+    ----------
+    name : str
+        A short name for the rule.
+
+    directions : tuple<(int, int)>
+        The (row, column) offsets of a leaper, or the unit directions of a
+        slider.
+    """
+    table_class = None
+
+    def __init__(self, name, directions):
+        self.name = name
+        self.directions = tuple(directions)
+        self._tables = {}
+
+    def table(self, width, height):
+        """Return the move table of the rule for a board size. """
+        table = self._tables.get((width, height))
+        if table is None:
+            table = self.table_class(get_geometry(width, height), self.directions)
+            self._tables[(width, height)] = table
+        return table
+
+    def __repr__(self):
+        return "{}({!r}, {!r})".format(type(self).__name__, self.name, self.directions)
+
+    def __reduce__(self):
+        return _shared, (type(self), self.name, self.directions)
+
+
+class Leaper(Movement):
+    """A rule that jumps directly to the cells at the given offsets. """
+    table_class = JumpTable
+
+
+class Slider(Movement):
+    """A rule that moves any distance along the given directions, without
+    passing over blocked cells.
+    """
+    table_class = RayTable
+
+
+KNIGHT = Leaper("knight", KNIGHT_DIRECTIONS)
+KING = Leaper("king", KING_DIRECTIONS)
+QUEEN = Slider("queen", KING_DIRECTIONS)
+ROOK = Slider("rook", ROOK_DIRECTIONS)
+BISHOP = Slider("bishop", BISHOP_DIRECTIONS)
+
+MOVEMENTS = {movement.name: movement for movement in (KNIGHT, KING, QUEEN, ROOK, BISHOP)}
+
+# rules by (class, name, directions), so that every copy of a rule unpickled
+# in a process (e.g. one sent with each move to an agent process) is the same
+# object, keeps its move tables and compares identical to the standard rules
+_SHARED = {(type(m), m.name, m.directions): m for m in MOVEMENTS.values()}
+
+
+def _shared(cls, name, directions):
+    """Return the process-wide instance of a movement rule. """
+    key = (cls, name, tuple(directions))
+    movement = _SHARED.get(key)
+    if movement is None:
+        movement = _SHARED[key] = cls(name, directions)
+    return movement
@@ -0,0 +1,295 @@
+"""
+Perft-style move generation counter for the game Isolation.
+
+`perft` walks the full game tree below a position to a fixed depth and counts
+the leaf positions without evaluating any of them. Because the counts only
+depend on the rules of the game, two board implementations that agree on every
+perft count (and on every intermediate move list, see `validate`) produce the
+same game tree. The same walk doubles as a pure move generation benchmark.
+
+Usage:
+
+    python -m isolation.perft --depth 4 --candidate mymodule:FastBoard
+    python -m isolation.perft --depth 4 --sizes 5 7 10 15 20
+"""
+import argparse
+import importlib
+import random
+import timeit
+
+from collections import namedtuple
+
+from .geometry import Geometry
+from .isolation import Board
+from .movement import MOVEMENTS
+
+Mismatch = namedtuple("Mismatch", ["path", "reference", "candidate"])
+PerftResult = namedtuple("PerftResult", ["leaves", "seconds", "leaves_per_sec"])
+ScalingResult = namedtuple("ScalingResult", ["size", "geometry_ms", "perft"])
+
+
+def perft(board, depth):
+    """Count the leaf positions exactly `depth` plies below the given board.
+
+    Terminal positions reached before the requested depth do not contribute
+    to the count, matching the usual perft convention.
+
+    Parameters
+    ----------
+    board : object
+        An `isolation.Board` or any object exposing the same
+        `get_legal_moves()` and `forecast_move()` interface.
+
+    depth : int
+        The number of plies to expand below the input board.
+
+    Returns
+    -------
+    int
+        The number of positions at exactly `depth` plies.
+    """
+    if depth == 0:
+        return 1
+
+    moves = board.get_legal_moves()
+    if depth == 1:
+        return len(moves)
+
+    return sum(perft(board.forecast_move(m), depth - 1) for m in moves)
+
+
+def divide(board, depth):
+    """Return the perft count below each legal move of the given board.
+
+    Parameters
+    ----------
+    board : object
+        An `isolation.Board` or compatible implementation.
+
+    depth : int
+        The total depth, including the root move (must be at least 1).
+
+    Returns
+    -------
+    dict<(int, int), int>
+        Map from each legal root move to the perft count `depth - 1` plies
+        below it.
+    """
+    return {m: perft(board.forecast_move(m), depth - 1)
+            for m in board.get_legal_moves()}
+
+
+def validate(reference, candidate, depth):
+    """Walk the game trees of two boards in lockstep and report every
+    position where their legal move lists disagree.
+
+    Move lists are compared as sets because `isolation.Board` shuffles its
+    moves. Only the moves common to both implementations are expanded, so
+    each mismatch is reported once rather than for the whole subtree.
+
+    Parameters
+    ----------
+    reference : object
+        The trusted board, normally an `isolation.Board`.
+
+    candidate : object
+        The board implementation under test, in the same position.
+
+    depth : int
+        The number of plies to compare below the input boards.
+
+    Returns
+    -------
+    list<Mismatch>
+        One entry per disagreeing position, holding the move path from the
+        root and the sorted move lists of both implementations.
+    """
+    mismatches = []
+    _validate(reference, candidate, depth, [], mismatches)
+    return mismatches
+
+
+def _validate(reference, candidate, depth, path, mismatches):
+    ref_moves = set(reference.get_legal_moves())
+    cand_moves = set(candidate.get_legal_moves())
+    if ref_moves != cand_moves:
+        mismatches.append(Mismatch(list(path), sorted(ref_moves), sorted(cand_moves)))
+
+    if depth == 0:
+        return
+
+    for m in sorted(ref_moves & cand_moves):
+        path.append(m)
+        _validate(reference.forecast_move(m), candidate.forecast_move(m),
+                  depth - 1, path, mismatches)
+        path.pop()
+
+
+def benchmark(board, depth, repeat=1):
+    """Time `perft` on the given board and report the move generation
+    throughput.
+
+    Parameters
+    ----------
+    board : object
+        An `isolation.Board` or compatible implementation.
+
+    depth : int
+        The perft depth to time.
+
+    repeat : int (optional)
+        The number of timed runs; the fastest run is reported.
+
+    Returns
+    -------
+    PerftResult
+        The leaf count, the best wall-clock time in seconds, and the number
+        of leaves generated per second.
+    """
+    best = float("inf")
+    leaves = 0
+    for _ in range(repeat):
+        start = timeit.default_timer()
+        leaves = perft(board, depth)
+        best = min(best, timeit.default_timer() - start)
+    return PerftResult(leaves, best, leaves / best if best > 0 else float("inf"))
+
+
+def scaling(sizes, depth, plies=2, seed=None, board_cls=Board, movement=None):
+    """Benchmark move generation on square boards of increasing size.
+
+    Parameters
+    ----------
+    sizes : iterable<int>
+        The board side lengths to benchmark, e.g. `range(5, 21)`.
+
+    depth : int
+        The perft depth used on each board.
+
+    plies : int (optional)
+        The number of random opening plies applied before counting.
+
+    seed : int (optional)
+        Seed for the random openings.
+
+    board_cls : type (optional)
+        The board implementation to benchmark.
+
+    movement : `isolation.movement.Movement` (optional)
+        The movement rule; knight moves if None.
+
+    Returns
+    -------
+    list<ScalingResult>
+        The time to build the lookup tables from scratch and the perft
+        result for each board size.
+    """
+    results = []
+    for size in sizes:
+        start = timeit.default_timer()
+        geometry = Geometry(size, size)
+        if movement is not None:
+            movement.table_class(geometry, movement.directions)
+        geometry_ms = 1000 * (timeit.default_timer() - start)
+        board = make_board(board_cls, size, size,
+                           opening(size, size, plies, seed, movement), movement)
+        results.append(ScalingResult(size, geometry_ms, benchmark(board, depth)))
+    return results
+
+
+def load_board_class(path):
+    """Import a board class from a "module:ClassName" string."""
+    module_name, _, class_name = path.partition(":")
+    return getattr(importlib.import_module(module_name), class_name or "Board")
+
+
+def opening(width, height, plies, seed=None, movement=None):
+    """Return a reproducible list of random opening moves on an empty board."""
+    rng = random.Random(seed)
+    board = Board("Player 1", "Player 2", width=width, height=height, movement=movement)
+    moves = []
+    for _ in range(plies):
+        legal = sorted(board.get_legal_moves())
+        if not legal:
+            break
+        move = rng.choice(legal)
+        board.apply_move(move)
+        moves.append(move)
+    return moves
+
+
+def make_board(board_cls, width, height, moves, movement=None):
+    """Construct a board of the given class and replay the moves on it. The
+    movement rule is only passed to the class if one is given.
+    """
+    kwargs = {} if movement is None else {"movement": movement}
+    board = board_cls("Player 1", "Player 2", width=width, height=height, **kwargs)
+    for move in moves:
+        board.apply_move(move)
+    return board
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Count, validate and benchmark Isolation move generation.")
+    parser.add_argument("-d", "--depth", type=int, default=3,
+                        help="Number of plies to expand (default: 3).")
+    parser.add_argument("--width", type=int, default=7)
+    parser.add_argument("--height", type=int, default=7)
+    parser.add_argument("--opening", type=int, default=2,
+                        help="Number of random opening plies to apply first (default: 2).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--movement", choices=sorted(MOVEMENTS), default=None,
+                        help="Movement rule of the players (default: knight).")
+    parser.add_argument("--candidate", default=None,
+                        help="Board class to validate as module:ClassName.")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--sizes", type=int, nargs="+", default=None,
+                        help="Benchmark square boards of the listed sizes instead.")
+    args = parser.parse_args(argv)
+    movement = MOVEMENTS[args.movement] if args.movement else None
+
+    if args.sizes:
+        print("{:>7}{:>14}{:>14}{:>12}{:>16}".format(
+            "Board", "Tables (ms)", "Leaves", "Time (s)", "Leaves/s"))
+        for row in scaling(args.sizes, args.depth, args.opening, args.seed,
+                           movement=movement):
+            print("{:>7}{:>14.2f}{:>14,d}{:>12.3f}{:>16,.0f}".format(
+                "{0}x{0}".format(row.size), row.geometry_ms, row.perft.leaves,
+                row.perft.seconds, row.perft.leaves_per_sec))
+        return 0
+
+    moves = opening(args.width, args.height, args.opening, args.seed, movement)
+    reference = make_board(Board, args.width, args.height, moves, movement)
+
+    print("Opening: {}".format(moves))
+    result = benchmark(reference, args.depth, args.repeat)
+    print("{:<12}{:>14,d} leaves {:>10.3f} s {:>14,.0f} leaves/s".format(
+        "reference", result.leaves, result.seconds, result.leaves_per_sec))
+
+    if args.candidate is None:
+        return 0
+
+    candidate = make_board(load_board_class(args.candidate),
+                           args.width, args.height, moves, movement)
+    cand_result = benchmark(candidate, args.depth, args.repeat)
+    print("{:<12}{:>14,d} leaves {:>10.3f} s {:>14,.0f} leaves/s".format(
+        "candidate", cand_result.leaves, cand_result.seconds,
+        cand_result.leaves_per_sec))
+    if result.seconds > 0 and cand_result.seconds > 0:
+        print("Speedup: {:.2f}x".format(result.seconds / cand_result.seconds))
+
+    mismatches = validate(reference, candidate, args.depth)
+    for mismatch in mismatches[:20]:
+        print("MISMATCH after {}: reference {} candidate {}".format(
+            mismatch.path, mismatch.reference, mismatch.candidate))
+    if mismatches or result.leaves != cand_result.leaves:
+        print("{} mismatching positions".format(len(mismatches)))
+        return 1
+
+    print("OK: move generation matches the reference")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,215 @@
+"""
+Proof-number search for forced wins in Isolation.
+
+Proof-number search grows a game tree towards the positions that are
+cheapest to prove or disprove, instead of to a fixed depth, so in narrow
+late-game positions it proves wins that lie far beyond the horizon of
+alpha-beta. The question is always whether the side to move at the root can
+force a win: OR nodes are positions with that side to move, AND nodes
+positions with the opponent to move, and a side that cannot move loses.
+
+`ProofNumberSearch` implements PN search and, optionally, PN² search: every
+node added to the tree is first evaluated by a small PN search of its own,
+whose tree is then discarded, trading time for a much smaller first-level
+tree.
+"""
+import timeit
+
+from collections import namedtuple
+
+INF = float("inf")
+
+WIN, LOSS, UNKNOWN = "win", "loss", "unknown"
+
+ProofResult = namedtuple("ProofResult", ["value", "move", "nodes", "proof"])
+ProofResult.__doc__ = """The outcome of a proof-number search.
+
+value is WIN or LOSS if the side to move is proven to win or lose, otherwise
+UNKNOWN; move is the winning move (None unless value is WIN); nodes is the
+number of nodes created; proof maps the `Board.zobrist_key` of every position
+of the proof tree with the winner to move to its winning move.
+"""
+
+
+class _Node(object):
+    __slots__ = ("board", "key", "move", "is_or", "pn", "dn", "parent", "children")
+
+    def __init__(self, board, move, is_or, parent):
+        self.board = board
+        self.key = board.zobrist_key()
+        self.move = move
+        self.is_or = is_or
+        self.parent = parent
+        self.children = None
+        num_moves = len(board.get_legal_moves())
+        if not num_moves:
+            # the side to move is stuck and loses
+            self.pn, self.dn = (INF, 0) if is_or else (0, INF)
+        elif is_or:
+            # mobility initialisation: disproving an OR node takes all moves
+            self.pn, self.dn = 1, num_moves
+        else:
+            self.pn, self.dn = num_moves, 1
+
+    def update(self):
+        children = self.children
+        if self.is_or:
+            self.pn = min(c.pn for c in children)
+            self.dn = sum(c.dn for c in children)
+        else:
+            self.pn = sum(c.pn for c in children)
+            self.dn = min(c.dn for c in children)
+
+
+class ProofNumberSearch(object):
+    """Prove or disprove that the side to move can force a win.
+
+    Parameters
+    ----------
+    max_nodes : int (optional)
+        The maximum number of nodes created per search, including the
+        nodes of second-level searches.
+
+    pn2 : bool (optional)
+        Evaluate new nodes with a second-level search (PN²).
+
+    mobility_threshold : int (optional)
+        `should_search` is True when both players together have at most
+        this many legal moves.
+
+    time_fraction : float (optional)
+        The share of the remaining move time `winning_move` may spend.
+
+    time_threshold : float (optional)
+        Milliseconds before the time limit at which a search gives up.
+    """
+
+    def __init__(self, max_nodes=20000, pn2=False, mobility_threshold=6,
+                 time_fraction=0.5, time_threshold=10.):
+        self.max_nodes = max_nodes
+        self.pn2 = pn2
+        self.mobility_threshold = mobility_threshold
+        self.time_fraction = time_fraction
+        self.time_threshold = time_threshold
+        self._proof = {}
+
+    def search(self, game, time_left=None):
+        """Run a proof-number search from the given position.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            The position to solve, for its active player.
+
+        time_left : callable (optional)
+            A function that returns the number of milliseconds left for the
+            search; the search is only bounded by `max_nodes` if None.
+
+        Returns
+        -------
+        ProofResult
+        """
+        self._nodes = 0
+        self._tree_nodes = 1
+        self._time_left = time_left
+        root = self._new_node(game, None, True, None)
+        self._grow(root, self.max_nodes, self.pn2)
+
+        if root.pn == 0:
+            proof = {}
+            self._collect_proof(root, proof)
+            return ProofResult(WIN, proof[root.key], self._nodes, proof)
+        if root.dn == 0:
+            return ProofResult(LOSS, None, self._nodes, {})
+        return ProofResult(UNKNOWN, None, self._nodes, {})
+
+    def should_search(self, game):
+        """Return True if the position is narrow enough to try a proof. """
+        mobility = (len(game.get_legal_moves(game.active_player)) +
+                    len(game.get_legal_moves(game.inactive_player)))
+        return mobility <= self.mobility_threshold
+
+    def winning_move(self, game, time_left):
+        """Return a move that forces a win for the active player, or None.
+
+        Positions on the proof tree of an earlier search are answered
+        instantly; otherwise a search is run if `should_search` holds, with
+        `time_fraction` of the remaining time.
+        """
+        move = self._proof.get(game.zobrist_key())
+        if move is not None:
+            return move
+        if not self.should_search(game):
+            return None
+
+        start = timeit.default_timer()
+        budget = self.time_fraction * time_left()
+        result = self.search(
+            game, lambda: budget - 1000 * (timeit.default_timer() - start))
+        if result.value == WIN:
+            self._proof = result.proof
+        return result.move
+
+    def _new_node(self, board, move, is_or, parent):
+        self._nodes += 1
+        return _Node(board, move, is_or, parent)
+
+    def _out_of_time(self):
+        return (self._time_left is not None and
+                self._time_left() < self.time_threshold)
+
+    def _grow(self, root, max_nodes, pn2):
+        """Expand the most-proving node until the root is solved or a
+        budget runs out. The tree of `root` is grown in place.
+        """
+        limit = self._nodes + max_nodes
+        expansions = 0
+        while root.pn and root.dn and self._nodes < limit:
+            expansions += 1
+            if expansions % 64 == 0 and self._out_of_time():
+                break
+
+            node = root
+            while node.children is not None:
+                if node.is_or:
+                    node = min(node.children, key=lambda c: c.pn)
+                else:
+                    node = min(node.children, key=lambda c: c.dn)
+
+            self._expand(node, limit, pn2)
+            while node is not root:
+                node = node.parent
+                pn, dn = node.pn, node.dn
+                node.update()
+                if node.pn == pn and node.dn == dn:
+                    break
+
+    def _expand(self, node, limit, pn2):
+        board = node.board
+        children = []
+        for move in board.get_legal_moves():
+            child = self._new_node(board.forecast_move(move), move, not node.is_or, node)
+            if pn2:
+                self._tree_nodes += 1
+                if child.pn and child.dn:
+                    # second level: search the child with a budget that grows
+                    # with the first-level tree, then throw its subtree away
+                    budget = min(self._tree_nodes, limit - self._nodes)
+                    if budget > 0:
+                        self._grow(child, budget, False)
+                        child.children = None
+            children.append(child)
+        node.children = children
+        node.update()
+
+    def _collect_proof(self, node, proof):
+        """Record the winning move of every OR node of a proven subtree. """
+        if node.children is None:
+            return
+        if node.is_or:
+            best = min(node.children, key=lambda c: (c.pn, -c.dn))
+            proof[node.key] = best.move
+            self._collect_proof(best, proof)
+        else:
+            for child in node.children:
+                self._collect_proof(child, proof)
@@ -0,0 +1,334 @@
+"""
+Retrograde-analysis tablebase for small Isolation boards.
+
+`solve` enumerates every position reachable from the empty board under the
+rules of `isolation.Board` (knight moves, free first placement), grouped by
+the number of blocked cells, and then works backwards from the last level to
+compute the exact result of each position with the distance to the end of the
+game. Positions are stored once per symmetry class of the board.
+
+The result of a position is a single number: the number of plies until the
+side to move is stuck when both sides play perfectly (the winner ends the
+game as fast as possible, the loser delays it as long as possible). The side
+to move wins exactly when this distance is odd.
+
+`write` stores the table in a compact binary file that `Tablebase` memory
+maps at lookup time, so a table can be shared by many processes at no cost.
+
+Usage:
+
+    python -m isolation.tablebase --width 4 --height 4 -o isolation_4x4.tb
+"""
+import argparse
+import mmap
+import struct
+import timeit
+
+from array import array
+from bisect import bisect_left
+
+from .geometry import get_geometry
+from .movement import KNIGHT
+
+MAGIC = b"ISTB"
+_HEADER = struct.Struct("<4sHHI")
+_LEVEL = struct.Struct("<QQI4x")
+
+
+class KeyCodec(object):
+    """Convert positions to canonical integer keys for one board size.
+
+    A key packs the bitmask of blocked cells with the cell index of each
+    player (`size` if the player has not moved yet). The canonical key is
+    the smallest key over all symmetries of the board that preserve knight
+    moves: the four reflections and rotations of any rectangle, plus the
+    four transpositions of a square board.
+    """
+
+    def __init__(self, width, height):
+        self.geometry = get_geometry(width, height)
+        self.jumps = KNIGHT.table(width, height).jumps
+        size = self.geometry.size
+        self.size = size
+        self.loc_bits = size.bit_length()
+        self.loc_mask = (1 << self.loc_bits) - 1
+        self.blocked_mask = (1 << size) - 1
+
+        h, w = height - 1, width - 1
+        transforms = [lambda r, c: (r, c), lambda r, c: (h - r, c),
+                      lambda r, c: (r, w - c), lambda r, c: (h - r, w - c)]
+        if width == height:
+            transforms += [lambda r, c: (c, r), lambda r, c: (w - c, r),
+                           lambda r, c: (c, h - r), lambda r, c: (w - c, h - r)]
+
+        cell_index = self.geometry.cell_index
+        self.permutations = [tuple(cell_index[t(r, c)] for r, c in self.geometry.cells)
+                             + (size,) for t in transforms]
+
+        # bit permutation tables, one per symmetry and byte of the blocked mask
+        self._chunks = (size + 7) // 8
+        self._tables = []
+        for perm in self.permutations:
+            tables = []
+            for chunk in range(self._chunks):
+                table = [0] * 256
+                for byte in range(256):
+                    mask = 0
+                    for bit in range(8):
+                        idx = chunk * 8 + bit
+                        if byte >> bit & 1 and idx < size:
+                            mask |= 1 << perm[idx]
+                    table[byte] = mask
+                tables.append(table)
+            self._tables.append(tables)
+
+    def pack(self, blocked, loc1, loc2):
+        return blocked | loc1 << self.size | loc2 << (self.size + self.loc_bits)
+
+    def unpack(self, key):
+        return (key & self.blocked_mask,
+                key >> self.size & self.loc_mask,
+                key >> (self.size + self.loc_bits) & self.loc_mask)
+
+    def canonical(self, blocked, loc1, loc2):
+        """ Return the canonical key of a position. """
+        best = None
+        for perm, tables in zip(self.permutations, self._tables):
+            mask = 0
+            rest = blocked
+            for table in tables:
+                mask |= table[rest & 0xFF]
+                rest >>= 8
+            key = self.pack(mask, perm[loc1], perm[loc2])
+            if best is None or key < best:
+                best = key
+        return best
+
+    def board_key(self, board):
+        """ Return the canonical key of an `isolation.Board` position. """
+        board_state = board._board_state
+        blocked = 0
+        for idx in range(self.size):
+            if board_state[idx]:
+                blocked |= 1 << idx
+        loc1 = board_state[-1]
+        loc2 = board_state[-2]
+        return self.canonical(blocked,
+                              self.size if loc1 is None else loc1,
+                              self.size if loc2 is None else loc2)
+
+    def successors(self, blocked, loc1, loc2):
+        """ Yield the positions reachable in one ply as (blocked, loc1, loc2)
+        tuples, following the rules of `isolation.Board`.
+        """
+        player_1_to_move = bin(blocked).count("1") % 2 == 0
+        loc = loc1 if player_1_to_move else loc2
+        targets = range(self.size) if loc == self.size else self.jumps[loc]
+        for idx in targets:
+            if not blocked >> idx & 1:
+                if player_1_to_move:
+                    yield blocked | 1 << idx, idx, loc2
+                else:
+                    yield blocked | 1 << idx, loc1, idx
+
+
+def best_distance(distances):
+    """Return the distance to the end of a position from the distances of
+    its children.
+    """
+    wins = [d for d in distances if d % 2 == 0]
+    if wins:
+        return 1 + min(wins)
+    if distances:
+        return 1 + max(distances)
+    return 0
+
+
+def solve(width, height, verbose=False):
+    """Enumerate and solve every reachable position of a board size.
+
+    Parameters
+    ----------
+    width, height : int
+        The board dimensions.
+
+    verbose : bool (optional)
+        Print progress for each level.
+
+    Returns
+    -------
+    list<(array, bytearray)>
+        For each number of blocked cells, the sorted canonical keys of the
+        reachable positions and the distance to the end of each of them.
+    """
+    codec = KeyCodec(width, height)
+    size = codec.size
+    levels = [array("Q", [codec.canonical(0, size, size)])]
+
+    start = timeit.default_timer()
+    while True:
+        children = set()
+        for key in levels[-1]:
+            for child in codec.successors(*codec.unpack(key)):
+                children.add(codec.canonical(*child))
+        if not children:
+            break
+        levels.append(array("Q", sorted(children)))
+        if verbose:
+            print("level {:>3}: {:>12,d} positions ({:.1f} s)".format(
+                len(levels) - 1, len(children), timeit.default_timer() - start))
+
+    solved = [None] * len(levels)
+    solved[-1] = (levels[-1], bytearray(len(levels[-1])))
+    for k in range(len(levels) - 2, -1, -1):
+        next_keys, next_values = solved[k + 1]
+        values = bytearray(len(levels[k]))
+        for i, key in enumerate(levels[k]):
+            distances = [next_values[bisect_left(next_keys, codec.canonical(*child))]
+                         for child in codec.successors(*codec.unpack(key))]
+            values[i] = best_distance(distances)
+        solved[k] = (levels[k], values)
+    if verbose:
+        print("solved in {:.1f} s".format(timeit.default_timer() - start))
+    return solved
+
+
+def write(path, width, height, solved):
+    """Write solved levels to a tablebase file.
+
+    The file holds a header, one (keys offset, values offset, count) entry
+    per level, then all key arrays (8-byte aligned) and all value arrays.
+    """
+    offset = _HEADER.size + _LEVEL.size * len(solved)
+    offset += -offset % 8
+    entries = []
+    for keys, _ in solved:
+        entries.append([offset, 0, len(keys)])
+        offset += 8 * len(keys)
+    for entry, (_, values) in zip(entries, solved):
+        entry[1] = offset
+        offset += len(values)
+
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, width, height, len(solved)))
+        for entry in entries:
+            f.write(_LEVEL.pack(*entry))
+        f.write(b"\0" * (entries[0][0] - f.tell()))
+        for keys, _ in solved:
+            f.write(keys.tobytes())
+        for _, values in solved:
+            f.write(bytes(values))
+
+
+class Tablebase(object):
+    """Read-only, memory-mapped view of a tablebase file.
+
+    Parameters
+    ----------
+    path : str
+        A file written by `write`.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.width, self.height, num_levels = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError("{} is not an isolation tablebase".format(path))
+        self.codec = KeyCodec(self.width, self.height)
+
+        view = memoryview(self._mmap)
+        self._levels = []
+        for k in range(num_levels):
+            keys_offset, values_offset, count = _LEVEL.unpack_from(
+                self._mmap, _HEADER.size + k * _LEVEL.size)
+            self._levels.append((view[keys_offset:keys_offset + 8 * count].cast("Q"),
+                                 view[values_offset:values_offset + count]))
+
+    def __len__(self):
+        return sum(len(keys) for keys, _ in self._levels)
+
+    def close(self):
+        """Release the memory map and the file. """
+        for keys, values in self._levels:
+            keys.release()
+            values.release()
+        self._levels = []
+        self._mmap.close()
+        self._file.close()
+
+    def lookup(self, key):
+        """Return the distance to the end for a canonical key, or None if
+        the position is not in the table.
+        """
+        level = bin(key & self.codec.blocked_mask).count("1")
+        if level >= len(self._levels):
+            return None
+        keys, values = self._levels[level]
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return values[i]
+        return None
+
+    def probe(self, board):
+        """Return the distance to the end of the game for the side to move
+        in the given board (odd if it wins), or None if the board is not
+        covered by the table (a different size or movement rule).
+        """
+        if ((board.width, board.height) != (self.width, self.height) or
+                board.movement is not KNIGHT):
+            return None
+        return self.lookup(self.codec.board_key(board))
+
+    def best_move(self, board):
+        """Return a move that wins as fast as possible, or loses as slowly
+        as possible, for the side to move; None if the board is not covered
+        by the table or has no legal moves.
+        """
+        if ((board.width, board.height) != (self.width, self.height) or
+                board.movement is not KNIGHT):
+            return None
+
+        scored = []
+        for move in board.get_legal_moves():
+            distance = self.lookup(self.codec.board_key(board.forecast_move(move)))
+            if distance is None:
+                return None
+            scored.append((distance, move))
+        if not scored:
+            return None
+
+        wins = [(d, m) for d, m in scored if d % 2 == 0]
+        if wins:
+            return min(wins)[1]
+        return max(scored)[1]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Solve a small Isolation board and write its tablebase.")
+    parser.add_argument("--width", type=int, default=5)
+    parser.add_argument("--height", type=int, default=5)
+    parser.add_argument("-o", "--output", default=None,
+                        help="Output file (default: isolation_<width>x<height>.tb).")
+    args = parser.parse_args(argv)
+
+    path = args.output or "isolation_{}x{}.tb".format(args.width, args.height)
+    solved = solve(args.width, args.height, verbose=True)
+    write(path, args.width, args.height, solved)
+
+    with Tablebase(path) as table:
+        root = table.lookup(solved[0][0][0])
+        print("{} positions written to {}".format(len(table), path))
+        print("Player {} wins the empty board in {} plies".format(
+            1 if root % 2 else 2, root))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Transposition tables and evaluation caches, optionally in shared memory.
+
+Both tables store one entry per slot, indexed by a 64-bit position key such
+as the Zobrist key of a board (see `Board.zobrist_key`). The first word of
+an entry is the key XOR-ed with the data words that follow it. Writers
+never lock; a reader recomputes the XOR and treats the slot as empty when it
+does not match the key, so an entry torn by two processes writing the same
+slot at once is simply ignored.
+
+A `TranspositionTable` entry holds the search depth, bound type and best
+move, and the score of a searched position. An `EvaluationCache` entry holds
+the value of one score function for one position and player.
+
+A table created with `shared=True` lives in a named shared memory block that
+other processes open with `attach(name)`, so several worker processes can
+reuse each other's work.
+"""
+import hashlib
+import struct
+
+from array import array
+from functools import update_wrapper
+from multiprocessing import shared_memory
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+_MASK = (1 << 64) - 1
+_DOUBLE = struct.Struct("<d")
+_WORD = struct.Struct("<Q")
+
+# XOR-ed into evaluation keys of positions scored for player 2
+_PLAYER_2_KEY = 0xC2B2AE3D27D4EB4F
+
+
+def _float_bits(value):
+    return _WORD.unpack(_DOUBLE.pack(value))[0]
+
+
+def _bits_float(bits):
+    return _DOUBLE.unpack(_WORD.pack(bits))[0]
+
+
+class _SlotTable(object):
+    """Fixed number of slots of `slot_words` 64-bit words each, in local or
+    shared memory.
+    """
+    slot_words = 1
+
+    def __init__(self, slots=1 << 16, shared=False, _shm=None):
+        size = slots * self.slot_words * _WORD.size
+        self._shm = _shm
+        if shared and _shm is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+        if self._shm is None:
+            self._words = array("Q", bytes(size))
+        else:
+            self._words = self._shm.buf[:size].cast("Q")
+        self.slots = slots
+        self.name = None if self._shm is None else self._shm.name
+
+    @classmethod
+    def attach(cls, name):
+        """Open the shared table created by another process. """
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(shm.size // (cls.slot_words * _WORD.size), _shm=shm)
+
+    def __len__(self):
+        return self.slots
+
+    def clear(self):
+        """Empty the table. """
+        size = self.slots * self.slot_words * _WORD.size
+        if self._shm is None:
+            self._words = array("Q", bytes(size))
+        else:
+            self._shm.buf[:size] = bytes(size)
+
+    def close(self):
+        """Detach from the shared memory block, if any. """
+        if self._shm is not None:
+            self._words.release()
+            self._shm.close()
+            self._shm = None
+
+    def unlink(self):
+        """Detach from and destroy the shared memory block; only the
+        process that created the table should call this.
+        """
+        shm = self._shm
+        self.close()
+        if shm is not None:
+            shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TranspositionTable(_SlotTable):
+    """A fixed-size, depth-preferred transposition table.
+
+    Parameters
+    ----------
+    slots : int (optional)
+        The number of entries; each takes 24 bytes.
+
+    shared : bool (optional)
+        Allocate the table in a named shared memory block that other
+        processes can attach to.
+
+    Attributes
+    ----------
+    name : str or None
+        The name of the shared memory block, or None for a local table.
+    """
+    slot_words = 3
+
+    def probe(self, key):
+        """Return the (depth, flag, value, move index) entry stored for a
+        position key, or None. The move index is None if no move was stored.
+        """
+        words = self._words
+        i = 3 * (key % self.slots)
+        check, data, value = words[i], words[i + 1], words[i + 2]
+        if check ^ data ^ value != key:
+            return None
+        move = data >> 18
+        return (data & 0xFFFF, data >> 16 & 3, _bits_float(value),
+                move - 1 if move else None)
+
+    def store(self, key, depth, flag, value, move=None):
+        """Store a search result, unless the slot already holds a deeper
+        result for the same position.
+        """
+        words = self._words
+        i = 3 * (key % self.slots)
+        old_data = words[i + 1]
+        if (words[i] ^ old_data ^ words[i + 2] == key and
+                old_data & 0xFFFF > depth):
+            return
+        data = depth | flag << 16 | (0 if move is None else move + 1) << 18
+        value = _float_bits(value)
+        words[i] = (key ^ data ^ value) & _MASK
+        words[i + 1] = data
+        words[i + 2] = value
+
+
+class EvaluationCache(_SlotTable):
+    """A fixed-size, always-replace cache of heuristic values.
+
+    Parameters
+    ----------
+    slots : int (optional)
+        The number of entries; each takes 16 bytes.
+
+    shared : bool (optional)
+        Allocate the cache in a named shared memory block that other
+        processes can attach to.
+
+    Attributes
+    ----------
+    name : str or None
+        The name of the shared memory block, or None for a local cache.
+    """
+    slot_words = 2
+
+    def get(self, key):
+        """Return the value stored for a key, or None. """
+        words = self._words
+        i = 2 * (key % self.slots)
+        value = words[i + 1]
+        if words[i] ^ value != key:
+            return None
+        return _bits_float(value)
+
+    def put(self, key, value):
+        """Store the value of a key, replacing whatever the slot held. """
+        words = self._words
+        i = 2 * (key % self.slots)
+        value = _float_bits(value)
+        words[i] = key ^ value
+        words[i + 1] = value
+
+
+def function_key(fn):
+    """Return a 64-bit key identifying a function by its qualified name,
+    the same in every process.
+    """
+    qualname = getattr(fn, "__qualname__", type(fn).__qualname__)
+    name = "{}.{}".format(fn.__module__, qualname).encode("utf-8")
+    return int.from_bytes(hashlib.sha1(name).digest()[:8], "little")
+
+
+class CachedScore(object):
+    """Score function wrapper that looks values up in an `EvaluationCache`
+    before computing them.
+
+    Values are keyed by the board's Zobrist key and movement rule, the
+    wrapped function and the side of the player scored, so the wrapped
+    function must depend on nothing else (e.g. not on the time left, unlike
+    `game_agent.TieredScore`). Players in different games and processes can
+    share one cache as long as they agree on what a function name means.
+
+    Parameters
+    ----------
+    score_fn : callable
+        The score function to wrap.
+
+    cache : EvaluationCache
+        The cache to read and fill.
+
+    Attributes
+    ----------
+    hits, misses : int
+        The number of lookups answered and not answered by the cache in
+        this process.
+    """
+
+    def __init__(self, score_fn, cache):
+        update_wrapper(self, score_fn)
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+        self._fn_key = function_key(score_fn)
+        self._movement_keys = {}
+
+    def __call__(self, game, player):
+        movement = game.movement
+        movement_key = self._movement_keys.get(movement)
+        if movement_key is None:
+            movement_key = self._movement_keys[movement] = (
+                function_key(type(movement)) ^ hash(movement.directions) & _MASK)
+        key = game.zobrist_key() ^ self._fn_key ^ movement_key
+        if player == game._player_2:
+            key ^= _PLAYER_2_KEY
+        value = self.cache.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = self.__wrapped__(game, player)
+        self.cache.put(key, value)
+        return value
@@ -0,0 +1,209 @@
+"""Record and analyse the search trees explored by `AlphaBetaPlayer`.
+
+A `SearchTracer` is attached to a single player instance and wraps its search
+methods on that instance only, so untraced players run the unmodified code
+with no overhead. For every call to `get_move` the tracer writes one JSON line
+with the node counts per ply, a histogram of the position within the move list
+at which each beta (or alpha) cutoff happened, and the node count, time and
+effective branching factor of each iteration of iterative deepening.
+
+Usage:
+
+    tracer = SearchTracer("trace.jsonl")
+    tracer.attach(player)
+    ...                     # play games
+    tracer.close()
+
+    python search_trace.py trace.jsonl
+"""
+import argparse
+import gzip
+import json
+import timeit
+
+TRACED_METHODS = ("get_move", "alphabeta", "max_value", "min_value")
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t")
+    return open(path, mode)
+
+
+class SearchTracer(object):
+    """Opt-in recorder for the search trees of `AlphaBetaPlayer` instances.
+
+    Parameters
+    ----------
+    path : str
+        The file that receives one JSON line per traced move. The file is
+        gzip compressed if the name ends with ".gz".
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = _open(path, "w")
+        self._record = None
+        self._ply = 0
+        self._children = []
+
+    def attach(self, player):
+        """Start tracing the searches of the given player instance. """
+        get_move, alphabeta = player.get_move, player.alphabeta
+        max_value, min_value = player.max_value, player.min_value
+
+        def traced_get_move(game, time_left):
+            self._record = {"move_count": game.move_count, "iterations": [],
+                            "nodes_by_ply": [], "cutoffs": []}
+            try:
+                return get_move(game, time_left)
+            finally:
+                self._write(self._record)
+                self._record = None
+
+        def traced_alphabeta(game, depth, *args, **kwargs):
+            record = self._record
+            nodes_before = sum(record["nodes_by_ply"]) if record else 0
+            self._ply, self._children = 0, [0]
+            self._count_node()
+            start = timeit.default_timer()
+            complete = False
+            try:
+                result = alphabeta(game, depth, *args, **kwargs)
+                complete = True
+                return result
+            finally:
+                if record is not None:
+                    nodes = sum(record["nodes_by_ply"]) - nodes_before
+                    record["iterations"].append({
+                        "depth": depth,
+                        "nodes": nodes,
+                        "ms": round(1000 * (timeit.default_timer() - start), 3),
+                        "complete": complete,
+                        "ebf": round(nodes ** (1. / depth), 3) if depth > 0 else 0.})
+
+        def traced_max_value(game, depth, alpha, beta, *args):
+            v = self._traced_node(max_value, game, depth, alpha, beta, args)
+            self._count_cutoff(v >= beta)
+            return v
+
+        def traced_min_value(game, depth, alpha, beta, *args):
+            v = self._traced_node(min_value, game, depth, alpha, beta, args)
+            self._count_cutoff(v <= alpha)
+            return v
+
+        player.get_move = traced_get_move
+        player.alphabeta = traced_alphabeta
+        player.max_value = traced_max_value
+        player.min_value = traced_min_value
+        return player
+
+    def detach(self, player):
+        """Restore the untraced search methods of the given player. """
+        for name in TRACED_METHODS:
+            player.__dict__.pop(name, None)
+
+    def close(self):
+        """Flush and close the trace file. """
+        self._file.close()
+
+    def _traced_node(self, search, game, depth, alpha, beta, args):
+        self._ply += 1
+        self._children[-1] += 1
+        self._count_node()
+        self._children.append(0)
+        try:
+            return search(game, depth, alpha, beta, *args)
+        finally:
+            self._ply -= 1
+
+    def _count_node(self):
+        if self._record is None:
+            return
+        nodes_by_ply = self._record["nodes_by_ply"]
+        while len(nodes_by_ply) <= self._ply:
+            nodes_by_ply.append(0)
+        nodes_by_ply[self._ply] += 1
+
+    def _count_cutoff(self, is_cutoff):
+        visited = self._children.pop()
+        if not is_cutoff or not visited or self._record is None:
+            return
+        cutoffs = self._record["cutoffs"]
+        while len(cutoffs) < visited:
+            cutoffs.append(0)
+        cutoffs[visited - 1] += 1
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+def load(path):
+    """Return the list of records stored in a trace file. """
+    with _open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(records):
+    """Aggregate trace records into per-ply, per-cutoff-position and
+    per-depth statistics.
+
+    Returns
+    -------
+    dict
+        "moves": the number of traced moves; "nodes_by_ply": total nodes at
+        each ply; "cutoffs": total cutoffs at each move list position;
+        "ebf": list of (depth, mean ebf, mean nodes, mean ms, completed
+        iterations, total iterations) for each iteration depth.
+    """
+    nodes_by_ply, cutoffs, by_depth = [], [], {}
+    for record in records:
+        for totals, values in ((nodes_by_ply, record["nodes_by_ply"]),
+                               (cutoffs, record["cutoffs"])):
+            totals.extend([0] * (len(values) - len(totals)))
+            for i, value in enumerate(values):
+                totals[i] += value
+        for it in record["iterations"]:
+            by_depth.setdefault(it["depth"], []).append(it)
+
+    ebf = []
+    for depth in sorted(by_depth):
+        iterations = by_depth[depth]
+        complete = [it for it in iterations if it["complete"]]
+        rows = complete or iterations
+        ebf.append((depth,
+                    sum(it["ebf"] for it in rows) / len(rows),
+                    sum(it["nodes"] for it in rows) / len(rows),
+                    sum(it["ms"] for it in rows) / len(rows),
+                    len(complete), len(iterations)))
+    return {"moves": len(records), "nodes_by_ply": nodes_by_ply,
+            "cutoffs": cutoffs, "ebf": ebf}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse AlphaBetaPlayer search traces.")
+    parser.add_argument("trace", help="Trace file written by SearchTracer.")
+    parser.add_argument("--max-rows", type=int, default=12,
+                        help="Maximum number of plies and cutoff positions to print.")
+    args = parser.parse_args(argv)
+
+    summary = summarize(load(args.trace))
+    print("Traced moves: {}".format(summary["moves"]))
+
+    print("\n{:>5}{:>14}".format("Ply", "Nodes"))
+    for ply, nodes in enumerate(summary["nodes_by_ply"][:args.max_rows]):
+        print("{:>5}{:>14,d}".format(ply, nodes))
+
+    total_cutoffs = sum(summary["cutoffs"]) or 1
+    print("\n{:>9}{:>12}{:>9}".format("Move #", "Cutoffs", "Share"))
+    for i, count in enumerate(summary["cutoffs"][:args.max_rows]):
+        print("{:>9}{:>12,d}{:>8.1f}%".format(i + 1, count, 100. * count / total_cutoffs))
+
+    print("\n{:>6}{:>8}{:>12}{:>10}{:>12}".format("Depth", "EBF", "Nodes", "ms", "Completed"))
+    for depth, ebf, nodes, ms, complete, total in summary["ebf"]:
+        print("{:>6}{:>8.2f}{:>12,.0f}{:>10.1f}{:>7}/{:<4}".format(
+            depth, ebf, nodes, ms, complete, total))
+
+
+if __name__ == "__main__":
+    main()
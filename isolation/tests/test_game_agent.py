@@ -3,13 +3,25 @@ tests to run and debug your minimax and alphabeta agents locally.  The test
 cases used by the project assistant are not public.
 """
 
+import os
+import sys
+import tempfile
+import timeit
 import unittest
 
 import isolation
+import batch_analysis
 import game_agent
+import heuristic_profile
 import sample_players
+import search_trace
+import tournament
 
+from functools import partial
 from importlib import reload
+from unittest import mock
+from isolation.movement import QUEEN
+from isolation.transposition import TranspositionTable
 
 
 class IsolationTest(unittest.TestCase):
@@ -29,6 +41,299 @@ class IsolationTest(unittest.TestCase):
         self.minimax_player.match_boards(self.game, self.game)
 
 
+class AlphaBetaTest(unittest.TestCase):
+    """Unit tests for the alpha-beta agent"""
+
+    def setUp(self):
+        self.player1 = game_agent.AlphaBetaPlayer(score_fn=sample_players.improved_score)
+        self.player2 = sample_players.GreedyPlayer()
+        self.game = self.make_game(self.player1)
+        self.player1.time_left = lambda: float("inf")
+
+    def make_game(self, player):
+        game = isolation.Board(player, self.player2)
+        for move in [(2, 3), (0, 5), (4, 4), (2, 6)]:
+            game.apply_move(move)
+        return game
+
+    def test_alphabeta_matches_minimax_value(self):
+        minimax = game_agent.MinimaxPlayer(search_depth=3, score_fn=sample_players.improved_score)
+        minimax.time_left = lambda: float("inf")
+        game = self.make_game(minimax)
+        minimax_value = max(minimax.min_value(game.forecast_move(m), 1)
+                            for m in game.get_legal_moves())
+        alphabeta_value = self.player1.max_value(self.game, 3, float("-inf"), float("inf"))
+        self.assertEqual(alphabeta_value, minimax_value)
+
+    def test_selective_search_returns_legal_move(self):
+        self.player1.selective = game_agent.SelectiveSearch(full_depth_moves=1)
+        start = timeit.default_timer()
+        time_left = lambda: 150 - 1000 * (timeit.default_timer() - start)
+        move = self.player1.get_move(self.game, time_left)
+        self.assertGreater(time_left(), 0)
+        self.assertIn(move, self.game.get_legal_moves(self.player1))
+
+    def test_late_moves_are_reduced_and_researched(self):
+        self.player1.selective = game_agent.SelectiveSearch(
+            full_depth_moves=1, reduction_depth=3, reduction=1, extension_mobility=0)
+        order, searched = [], []  # moves are shuffled: script by visit order
+
+        def scripted_min_value(child, depth, alpha, beta, extensions=0):
+            move = child.get_player_location(self.player1)
+            searched.append((move, depth))
+            if move not in order:
+                order.append(move)
+            rank = order.index(move)
+            if rank == 0:
+                return 5.
+            if rank == 2:  # beats alpha when reduced and at full depth
+                return 10. if depth == 1 else 7.
+            return 0.
+
+        self.player1.min_value = scripted_min_value
+        v = self.player1.max_value(self.game, 3, float("-inf"), float("inf"))
+        self.assertEqual(v, 7.)
+        self.assertEqual(sorted(order), sorted(self.game.get_legal_moves()))
+        self.assertEqual(searched, [(order[0], 2), (order[1], 1), (order[2], 1), (order[2], 2)] +
+                         [(m, 1) for m in order[3:]])
+
+    def test_low_mobility_children_are_extended(self):
+        self.player1.selective = game_agent.SelectiveSearch(
+            full_depth_moves=8, extension_mobility=2, max_extensions=2)
+        moves = self.game.get_legal_moves()
+        forcing = {m for m in moves
+                   if len(self.game.forecast_move(m).get_legal_moves(self.player1)) <= 2}
+        self.assertTrue(0 < len(forcing) < len(moves))
+        searched = []
+
+        def scripted_min_value(child, depth, alpha, beta, extensions=0):
+            searched.append((child.get_player_location(self.player1), depth, extensions))
+            return 0.
+
+        self.player1.min_value = scripted_min_value
+        for extensions in range(3):
+            del searched[:]
+            self.player1.max_value(self.game, 3, float("-inf"), float("inf"), extensions)
+            extended = extensions < 2
+            self.assertEqual(sorted(searched),
+                             sorted((m, 3, extensions + 1) if extended and m in forcing
+                                    else (m, 2, extensions) for m in moves))
+
+    def test_search_tracer_records_iterations(self):
+        path = os.path.join(tempfile.mkdtemp(), "trace.jsonl")
+        tracer = search_trace.SearchTracer(path)
+        tracer.attach(self.player1)
+        start = timeit.default_timer()
+        self.player1.get_move(self.game, lambda: 100 - 1000 * (timeit.default_timer() - start))
+        tracer.detach(self.player1)
+        tracer.close()
+
+        records = search_trace.load(path)
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["nodes_by_ply"][0], len(records[0]["iterations"]))
+        self.assertEqual(search_trace.summarize(records)["ebf"][0][0], 1)
+        self.assertNotIn("max_value", self.player1.__dict__)
+
+    def test_time_manager_skips_unfinishable_iteration(self):
+        manager = game_agent.TimeManager(safety=1.)
+        manager.start_move(self.game, lambda: 150.)
+        manager.record(1, 1.)
+        manager.record(2, 4.)
+        self.assertEqual(manager.effective_branching_factor(), 4.)
+        self.assertTrue(manager.can_start(3, lambda: 20.))
+        self.assertFalse(manager.can_start(3, lambda: 10.))
+
+    def test_time_manager_charges_proof_search_move(self):
+        clock = [150.]
+
+        class ProofSearch(object):
+            def winning_move(self, game, time_left):
+                clock[0] -= 40.
+                return game.get_legal_moves()[0]
+
+        manager = game_agent.TimeManager(game_time=1000.)
+        self.player1.time_manager = manager
+        self.player1.proof_search = ProofSearch()
+        move = self.player1.get_move(self.game, lambda: clock[0])
+        self.assertTrue(self.player1.search_stats["proof"])
+        self.assertIn(move, self.game.get_legal_moves(self.player1))
+        self.assertEqual(manager.game_time_used, 40.)
+
+    def test_transposition_table_keeps_search_value(self):
+        self.player1.alphabeta(self.game, 4)
+        expected = self.player1.search_stats["score"]
+        self.player1.transposition_table = TranspositionTable(1 << 10)
+        for depth in range(1, 5):
+            self.player1.alphabeta(self.game, depth)
+        self.assertEqual(self.player1.search_stats["score"], expected)
+
+    def test_empty_board_misses_empty_table(self):
+        board = isolation.Board(self.player1, self.player2)
+        self.assertNotEqual(board.zobrist_key(), 0)
+        self.assertEqual(board.zobrist_key(), board._compute_zobrist_key())
+        self.assertIsNone(TranspositionTable(1 << 10).probe(board.zobrist_key()))
+
+    def test_partial_iteration_improves_on_previous_best(self):
+        moves = sorted(self.game.get_legal_moves())
+        searched = []
+
+        def scripted_min_value(child, depth, alpha, beta, extensions=0):
+            move = child.get_player_location(self.player1)
+            searched.append((depth, move))
+            if depth == 0:  # first iteration: moves[0] is best
+                return 10. if move == moves[0] else 0.
+            if len(searched) == len(moves) + 3:
+                raise game_agent.SearchTimeout()
+            return 1. if move == moves[0] else 5.
+
+        self.player1.min_value = scripted_min_value
+        move = self.player1.get_move(self.game, lambda: float("inf"))
+        self.assertEqual(searched[len(moves)], (1, moves[0]))  # PV first
+        self.assertEqual(move, searched[len(moves) + 1][1])
+        self.assertEqual(self.player1.search_stats["depth"], 1)
+        self.assertEqual(self.player1.search_stats["partial_depth"], 2)
+        self.assertEqual(self.player1.search_stats["score"], 5.)
+
+    def test_timeout_on_entry_ignores_previous_root_result(self):
+        self.player1.alphabeta(self.game, 2)
+        self.assertIsNotNone(self.player1._root_best)
+
+        game = self.game.forecast_move(self.game.get_legal_moves()[0])
+        game.apply_move(game.get_legal_moves()[0])
+        move = self.player1.get_move(game, lambda: 5.)
+        self.assertEqual(move, (-1, -1))
+        self.assertIsNone(self.player1._root_best)
+        self.assertNotIn("partial_depth", self.player1.search_stats)
+
+    def test_tiered_score_switches_by_ply_and_time(self):
+        tiered = game_agent.TieredScore(expensive=sample_players.improved_score,
+                                        cheap=sample_players.open_move_score,
+                                        root_plies=2, low_time=20.)
+        self.player1.score = tiered
+        self.player1.alphabeta(self.game, 2)
+        stats = self.player1.search_stats["score_tiers"]
+        self.assertGreater(stats["expensive"], 0)
+        self.assertEqual(stats["cheap"], 0)
+        self.assertEqual(stats["root_plies"], 2)
+
+        self.player1.search_stats = {}
+        self.player1.alphabeta(self.game, 3)
+        self.assertGreater(self.player1.search_stats["score_tiers"]["cheap"], 0)
+
+        self.player1.search_stats = {}
+        self.player1.time_left = lambda: 10.
+        child = self.game.forecast_move(self.game.get_legal_moves()[0])
+        self.assertEqual(tiered(child, self.player1),
+                         sample_players.open_move_score(child, self.player1))
+        self.assertEqual(self.player1.search_stats["score_tiers"]["cheap"], 1)
+
+    def test_batch_analysis_matches_direct_search(self):
+        self.player1.alphabeta(self.game, 3)
+        expected = self.player1.search_stats["score"]
+        factory = partial(game_agent.AlphaBetaPlayer, score_fn=sample_players.improved_score)
+        with batch_analysis.BatchAnalyzer(factory, processes=2, table_slots=1 << 10) as analyzer:
+            results = sorted(analyzer.analyse([self.game, self.game.to_bytes()], depth=3))
+        self.assertEqual([r.index for r in results], [0, 1])
+        for result in results:
+            self.assertEqual(result.depth, 3)
+            self.assertEqual(result.score, expected)
+            self.assertIn(result.move, self.game.get_legal_moves())
+
+    def test_batch_analysis_uses_movement(self):
+        game = isolation.Board(self.player1, self.player2, movement=QUEEN)
+        for move in [(3, 3), (0, 0)]:
+            game.apply_move(move)
+        factory = partial(game_agent.AlphaBetaPlayer, score_fn=sample_players.improved_score)
+        with batch_analysis.BatchAnalyzer(factory, processes=2, table_slots=1 << 10,
+                                          movement=QUEEN) as analyzer:
+            results = list(analyzer.analyse([game, game.to_bytes()], depth=2))
+        self.assertEqual(len(results), 2)
+        for result in results:
+            self.assertIn(result.move, game.get_legal_moves())
+
+
+
+class TournamentTest(unittest.TestCase):
+    """Unit tests for the tournament result cache"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = tournament.ResultCache(os.path.join(self.directory, "cache.json"))
+
+    def test_cached_pairings_are_not_replayed(self):
+        cpu_agents = [tournament.Agent(sample_players.RandomPlayer(), "Random")]
+        test_agents = [tournament.Agent(sample_players.GreedyPlayer(), "Greedy")]
+        with mock.patch.object(tournament, "play_round", wraps=tournament.play_round) as play_round:
+            first = tournament.play_matches(cpu_agents, test_agents, 1, self.cache)
+            self.assertEqual(play_round.call_count, 1)
+            second = tournament.play_matches(cpu_agents, test_agents, 1, self.cache)
+            self.assertEqual(play_round.call_count, 1)
+        self.assertEqual(second, first)
+
+    def test_score_source_changes_only_its_keys(self):
+        path = os.path.join(self.directory, "edited_score.py")
+        cpu_agent = tournament.Agent(sample_players.RandomPlayer(), "Random")
+        source = ("def helper(game):\n    return {helper}\n\n"
+                  "def score_a(game, player):\n    return helper(game)\n\n"
+                  "def score_b(game, player):\n    return {score_b}\n")
+
+        def keys(**edits):
+            # edits change the file length so neither linecache nor the
+            # bytecode cache can mistake the new file for the old one
+            with open(path, "w") as f:
+                f.write(source.format(**edits))
+            if "edited_score" in sys.modules:
+                module = reload(sys.modules["edited_score"])
+            else:
+                module = __import__("edited_score")
+            result = []
+            for score_fn in (module.score_a, module.score_b, sample_players.improved_score):
+                player = game_agent.AlphaBetaPlayer(score_fn=score_fn)
+                self.players.append(player)  # keep ids unique within the cache
+                result.append(self.cache.key(cpu_agent, tournament.Agent(player, ""), 1, 0))
+            return result
+
+        self.players = []
+        sys.path.insert(0, self.directory)
+        try:
+            a, b, improved = keys(helper="0.", score_b="0.")
+            self.assertEqual(keys(helper="0.", score_b="0."), [a, b, improved])
+
+            a_2, b_2, improved_2 = keys(helper="0.", score_b="10.")
+            self.assertEqual((a_2, improved_2), (a, improved))
+            self.assertNotEqual(b_2, b)
+
+            a_3, b_3, improved_3 = keys(helper="100.", score_b="10.")
+            self.assertEqual((b_3, improved_3), (b_2, improved))
+            self.assertNotEqual(a_3, a)
+        finally:
+            sys.path.remove(self.directory)
+            sys.modules.pop("edited_score", None)
+
+
+class HeuristicProfileTest(unittest.TestCase):
+    """Unit tests for the heuristic cost profiler"""
+
+    def test_profile_combines_cost_depth_and_cached_win_rate(self):
+        corpus = heuristic_profile.make_corpus(20, seed=1)
+        self.assertEqual(len(corpus), 20)
+
+        cache = tournament.ResultCache(os.path.join(tempfile.mkdtemp(), "cache.json"))
+        cpu_agents = tournament.make_cpu_agents()[:1]
+        test_agents = tournament.make_test_agents()[:2]
+        cache.put(cache.key(cpu_agents[0], test_agents[0], 2, 0),
+                  {"wins": 3, "losses": 1, "timeouts": 0, "forfeits": 0})
+
+        rows = heuristic_profile.profile(test_agents, corpus, corpus[:1], cache,
+                                         cpu_agents, num_matches=2, iterations=1,
+                                         time_limit=30)
+        self.assertEqual([row["name"] for row in rows], ["AB_Improved", "AB_Custom"])
+        self.assertEqual(rows[0]["win_rate"], 0.75)
+        self.assertAlmostEqual(rows[0]["win_rate_per_us"], 0.75 / rows[0]["us_per_eval"])
+        self.assertIsNone(rows[1]["win_rate"])
+        for row in rows:
+            self.assertGreater(row["us_per_eval"], 0)
+            self.assertGreaterEqual(row["depth"], 1)
 
 
 if __name__ == '__main__':
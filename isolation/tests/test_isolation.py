@@ -0,0 +1,331 @@
+"""Unit tests for the isolation board core and its tooling."""
+
+import multiprocessing
+import os
+import random
+import tempfile
+import unittest
+
+from isolation import Board
+from isolation.adjudication import PartitionAdjudicator
+from isolation.agent_process import AgentProcess
+from isolation.geometry import get_geometry
+from isolation.movement import KNIGHT, KNIGHT_DIRECTIONS, MOVEMENTS, QUEEN, Leaper
+from isolation.transposition import CachedScore, EvaluationCache
+from isolation.tablebase import Tablebase, best_distance, solve, write
+from isolation.perft import perft, divide, validate, make_board, opening
+from isolation.proof_number import ProofNumberSearch, WIN, LOSS, UNKNOWN
+from sample_players import GreedyPlayer, RandomPlayer, improved_score
+
+
+class PerftTest(unittest.TestCase):
+
+    def test_perft_empty_board(self):
+        board = Board("Player 1", "Player 2", width=5, height=5)
+        self.assertEqual(perft(board, 1), 25)
+        self.assertEqual(perft(board, 2), 25 * 24)
+
+    def test_divide_sums_to_perft(self):
+        board = make_board(Board, 7, 7, opening(7, 7, 2, seed=1))
+        self.assertEqual(sum(divide(board, 3).values()), perft(board, 3))
+
+    def test_validate_detects_mismatch(self):
+
+        class NoCornerBoard(Board):
+            def copy(self):
+                new_board = NoCornerBoard(self._player_1, self._player_2,
+                                          width=self.width, height=self.height)
+                new_board.move_count = self.move_count
+                new_board._active_player = self._active_player
+                new_board._inactive_player = self._inactive_player
+                new_board._board_state = list(self._board_state)
+                return new_board
+
+            def get_legal_moves(self, player=None):
+                return [m for m in Board.get_legal_moves(self, player) if m != (0, 0)]
+
+        moves = opening(5, 5, 2, seed=3)
+        reference = make_board(Board, 5, 5, moves)
+        self.assertEqual(validate(reference, make_board(Board, 5, 5, moves), 3), [])
+        self.assertTrue(validate(reference, make_board(NoCornerBoard, 5, 5, moves), 3))
+
+
+class SerializationTest(unittest.TestCase):
+
+    def test_round_trip_rebinds_players(self):
+        board = Board("Player 1", "Player 2", 6, 8)
+        self.assertEqual(Board.from_bytes(board.to_bytes(), "A", "B")._board_state,
+                         board._board_state)
+        for move in opening(6, 8, 7, seed=2):
+            board.apply_move(move)
+
+        copy = Board.from_bytes(board.to_bytes(), "A", "B")
+        self.assertEqual(copy._board_state, board._board_state)
+        self.assertEqual(copy.move_count, 7)
+        self.assertEqual(copy.active_player, "B")
+        self.assertEqual(sorted(copy.get_legal_moves()), sorted(board.get_legal_moves()))
+        self.assertEqual(len(board.to_bytes()), 11 + 6)
+
+    def test_active_player_is_bound_to_side_to_move(self):
+        board = Board("Player 1", "Player 2")
+        for _ in range(3):
+            copy = Board.from_bytes(board.to_bytes(), active="A")
+            self.assertEqual(copy.active_player, "A")
+            self.assertEqual(copy.zobrist_key(), board.zobrist_key())
+            with self.assertRaises(RuntimeError):
+                copy.inactive_player.get_move(copy, lambda: 150.)
+            board.apply_move(board.get_legal_moves()[0])
+
+    def test_missing_players_get_distinct_placeholders(self):
+        board = Board("Player 1", "Player 2")
+        for move in opening(7, 7, 3, seed=4):
+            board.apply_move(move)
+        copy = Board.from_bytes(board.to_bytes())
+        self.assertIsNot(copy.active_player, copy.inactive_player)
+        self.assertEqual(sorted(copy.get_legal_moves()), sorted(board.get_legal_moves()))
+        self.assertEqual(copy.get_player_location(copy.inactive_player),
+                         board.get_player_location(board.inactive_player))
+
+
+class GeometryTest(unittest.TestCase):
+
+    def test_geometry_is_shared(self):
+        self.assertIs(Board(1, 2, 9, 6).geometry, Board(3, 4, 9, 6).geometry)
+        self.assertIs(get_geometry(20, 20), get_geometry(20, 20))
+
+    def test_knight_jumps_match_knight_moves(self):
+        geometry = get_geometry(9, 6)
+        jumps = KNIGHT.table(9, 6).jumps
+        for idx, (r, c) in enumerate(geometry.cells):
+            expected = {(r + dr, c + dc) for dr, dc in KNIGHT_DIRECTIONS
+                        if 0 <= r + dr < 6 and 0 <= c + dc < 9}
+            self.assertEqual({geometry.cells[n] for n in jumps[idx]}, expected)
+            self.assertEqual(geometry.cell_index[(r, c)], r + c * 6)
+
+    def test_knight_attacks_match_jumps(self):
+        geometry = get_geometry(9, 6)
+        table = KNIGHT.table(9, 6)
+        for idx in range(geometry.size):
+            self.assertEqual(table.attacks(1 << idx, geometry.full_mask),
+                             sum(1 << n for n in table.jumps[idx]))
+        self.assertEqual(table.attacks(geometry.full_mask, geometry.full_mask),
+                         sum(1 << idx for idx in range(geometry.size) if table.jumps[idx]))
+
+    def test_bitboards_match_legal_moves(self):
+        board = Board("p1", "p2")
+        for move in [(3, 3), (2, 2), (1, 4), (0, 0), (3, 5)]:
+            board.apply_move(move)
+        geometry = board.geometry
+
+        def mask(cells):
+            return sum(1 << geometry.cell_index[cell] for cell in cells)
+
+        self.assertEqual(board.blank_mask(), mask(board.get_blank_spaces()))
+        for player in ("p1", "p2"):
+            self.assertEqual(board.move_mask(player), mask(board.get_legal_moves(player)))
+
+        # two moves of the active player while the opponent stands still
+        player = board.active_player
+        blank = set(board.get_blank_spaces())
+        expected = set(board.get_legal_moves())
+        for r, c in board.get_legal_moves():
+            expected.update((r + dr, c + dc) for dr, dc in KNIGHT_DIRECTIONS
+                            if (r + dr, c + dc) in blank)
+        self.assertEqual(board.reachable_mask(player, 2), mask(expected))
+
+
+class MovementTest(unittest.TestCase):
+
+    @staticmethod
+    def scanned_moves(board, movement):
+        """Legal moves of the active player found by walking each direction."""
+        r0, c0 = board.get_player_location(board.active_player)
+        moves = set()
+        for dr, dc in movement.directions:
+            r, c = r0 + dr, c0 + dc
+            while (0 <= r < board.height and 0 <= c < board.width and
+                   not board._board_state[r + c * board.height]):
+                moves.add((r, c))
+                if isinstance(movement, Leaper):
+                    break
+                r, c = r + dr, c + dc
+        return moves
+
+    def test_move_tables_match_scanned_moves(self):
+        rng = random.Random(0)
+        for movement in MOVEMENTS.values():
+            board = Board("p1", "p2", 6, 5, movement=movement)
+            board.apply_move((2, 2))
+            board.apply_move((0, 0))
+            geometry = board.geometry
+            while True:
+                moves = board.get_legal_moves()
+                self.assertEqual(set(moves), self.scanned_moves(board, movement))
+                self.assertEqual(board.move_mask(),
+                                 sum(1 << geometry.cell_index[m] for m in moves))
+                if not moves:
+                    break
+                board = board.forecast_move(rng.choice(sorted(moves)))
+                self.assertIs(board.movement, movement)
+
+    def test_custom_leaper(self):
+        camel = Leaper("camel", [(3, 1), (1, 3), (-3, 1), (-1, 3),
+                                 (3, -1), (1, -3), (-3, -1), (-1, -3)])
+        board = Board("p1", "p2", movement=camel)
+        board.apply_move((0, 0))
+        board.apply_move((6, 6))
+        self.assertEqual(set(board.get_legal_moves()), {(3, 1), (1, 3)})
+        copy = Board.from_bytes(board.to_bytes(), "p1", "p2", movement=camel)
+        self.assertEqual(set(copy.get_legal_moves()), {(3, 1), (1, 3)})
+
+
+def _cached_evaluations(name, data):
+    """Score a position through an attached cache in another process."""
+    cache = EvaluationCache.attach(name)
+    score = CachedScore(improved_score, cache)
+    board = Board.from_bytes(data, "p1", "p2")
+    value = score(board, "p1")
+    cache.close()
+    return value, score.hits
+
+
+class EvaluationCacheTest(unittest.TestCase):
+
+    def test_cached_score_returns_wrapped_values(self):
+        score = CachedScore(improved_score, EvaluationCache(1 << 10))
+        board = Board("p1", "p2")
+        for move in [(3, 3), (2, 2), (1, 4), (0, 0)]:
+            board.apply_move(move)
+        for player in ("p1", "p2", "p1"):
+            self.assertEqual(score(board, player), improved_score(board, player))
+        self.assertEqual((score.hits, score.misses), (1, 2))
+
+        queen_board = Board("p1", "p2", movement=MOVEMENTS["queen"])
+        for move in [(3, 3), (2, 2), (1, 4), (0, 0)]:
+            queen_board.apply_move(move)
+        self.assertEqual(score(queen_board, "p1"), improved_score(queen_board, "p1"))
+        self.assertEqual(score.misses, 3)
+
+    def test_cache_is_shared_between_processes(self):
+        cache = EvaluationCache(1 << 10, shared=True)
+        try:
+            board = Board("p1", "p2")
+            board.apply_move((3, 3))
+            board.apply_move((2, 2))
+            CachedScore(improved_score, cache)(board, "p1")
+            with multiprocessing.Pool(1) as pool:
+                value, hits = pool.apply(_cached_evaluations, (cache.name, board.to_bytes()))
+            self.assertEqual((value, hits), (improved_score(board, "p1"), 1))
+        finally:
+            cache.unlink()
+
+
+class AdjudicationTest(unittest.TestCase):
+
+    def test_adjudicated_winner_matches_exhaustive_search(self):
+        adjudicator = PartitionAdjudicator(max_nodes=10)
+        rng = random.Random(0)
+        decided = 0
+        for _ in range(200):
+            board = Board("Player 1", "Player 2", 4, 4)
+            for move in opening(4, 4, 6, seed=rng.random()):
+                board.apply_move(move)
+            while board.get_legal_moves():
+                winner = adjudicator(board)
+                if winner is not None:
+                    distance = exact_distance(board)
+                    self.assertEqual(winner, board.active_player if distance % 2
+                                     else board.inactive_player)
+                    decided += 1
+                board.apply_move(rng.choice(sorted(board.get_legal_moves())))
+        self.assertGreater(decided, 0)
+
+    def test_play_stops_adjudicated_game(self):
+        board = Board(GreedyPlayer(), RandomPlayer(), 5, 5)
+        winner, history, outcome = board.play(adjudicator=lambda game: game.inactive_player)
+        self.assertEqual((winner, history, outcome), (board.inactive_player, [], "adjudicated"))
+
+
+class MovementProbe(object):
+    """Agent that answers with what it sees instead of a move."""
+
+    def get_move(self, game, time_left):
+        return sorted(game.get_legal_moves()), game.movement is QUEEN
+
+
+class AgentProcessTest(unittest.TestCase):
+
+    def test_remote_agents_play_full_game(self):
+        with AgentProcess(GreedyPlayer) as player1, AgentProcess(RandomPlayer) as player2:
+            winner, history, outcome = Board(player1, player2, 5, 5).play(time_limit=1000)
+            self.assertIn(winner, (player1, player2))
+            self.assertEqual(outcome, "illegal move")
+            self.assertEqual(len(player1.latencies) + len(player2.latencies), len(history) + 1)
+
+    def test_remote_agent_uses_board_movement(self):
+        with AgentProcess(MovementProbe) as player:
+            board = Board(player, "Player 2", movement=QUEEN)
+            board.apply_move((3, 3))
+            board.apply_move((0, 0))
+            moves, shared = player.get_move(board, lambda: 1000.)
+            self.assertEqual(moves, sorted(board.get_legal_moves()))
+            self.assertTrue(shared)
+
+
+def exact_distance(board):
+    """Solve the position by exhaustive search (small boards only)."""
+    return best_distance([exact_distance(board.forecast_move(m))
+                          for m in board.get_legal_moves()])
+
+
+class TablebaseTest(unittest.TestCase):
+
+    def test_tablebase_matches_exhaustive_search(self):
+        path = os.path.join(tempfile.mkdtemp(), "isolation_4x3.tb")
+        write(path, 4, 3, solve(4, 3))
+        rng = random.Random(0)
+        with Tablebase(path) as table:
+            for _ in range(10):
+                board = Board("Player 1", "Player 2", 4, 3)
+                while True:
+                    self.assertEqual(table.probe(board), exact_distance(board))
+                    moves = board.get_legal_moves()
+                    if not moves:
+                        break
+                    board.apply_move(rng.choice(sorted(moves)))
+            self.assertIsNone(table.probe(Board("Player 1", "Player 2", 5, 5)))
+
+
+
+class ProofNumberTest(unittest.TestCase):
+
+    def test_proofs_match_exhaustive_search(self):
+        rng = random.Random(1)
+        for pn2 in (False, True):
+            search = ProofNumberSearch(max_nodes=10 ** 6, pn2=pn2)
+            for _ in range(10):
+                board = Board("Player 1", "Player 2", 5, 4)
+                for _ in range(rng.randint(2, 6)):
+                    moves = sorted(board.get_legal_moves())
+                    if not moves:
+                        break
+                    board.apply_move(rng.choice(moves))
+                if not board.get_legal_moves():
+                    continue
+
+                result = search.search(board)
+                wins = exact_distance(board) % 2 == 1
+                self.assertEqual(result.value, WIN if wins else LOSS)
+                if wins:
+                    # every position of the proof tree is won by its mover
+                    self.assertEqual(result.move, result.proof[board.zobrist_key()])
+                    self.assertEqual(exact_distance(board.forecast_move(result.move)) % 2, 0)
+
+    def test_node_budget_leaves_result_unknown(self):
+        result = ProofNumberSearch(max_nodes=50).search(Board("Player 1", "Player 2"))
+        self.assertEqual(result.value, UNKNOWN)
+        self.assertIsNone(result.move)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,14 +10,31 @@ The matches are fair because the board is initialized randomly for both
 players, and the players play each match twice -- once as the first player and
 once as the second player.  Randomizing the openings and switching the player
 order corrects for imbalances due to both starting position and initiative.
+
+Results are cached per pairing in `CACHE_FILE`, keyed by a fingerprint of
+both agents (the source of their classes and score functions and of the
+helpers those call, and their parameters) and of the code that plays the
+games (the isolation package and `play_round`), so rerunning the tournament
+only replays the pairings whose agents, rules, number of matches or time
+limit changed. Use --no-cache to replay everything.
 """
+import argparse
+import glob
+import hashlib
+import inspect
 import itertools
+import json
+import os
 import random
 import warnings
 
 from collections import namedtuple
 
+import isolation
+
 from isolation import Board
+from isolation.adjudication import PartitionAdjudicator
+from isolation.transposition import CachedScore, EvaluationCache
 from sample_players import (RandomPlayer, open_move_score,
                             improved_score, center_score)
 from game_agent import (MinimaxPlayer, AlphaBetaPlayer, custom_score,
@@ -26,6 +43,7 @@ from game_agent import (MinimaxPlayer, AlphaBetaPlayer, custom_score,
 NUM_MATCHES = 25  # number of matches against each opponent
 TIME_LIMIT = 150  # number of milliseconds before timeout
 ITERATIONS = 6  # number of iterations for statistical significance
+CACHE_FILE = ".tournament_cache.json"  # per-pairing results of earlier runs
 
 DESCRIPTION = """
 This script evaluates the performance of the custom_score evaluation
@@ -37,13 +55,214 @@ game_agent.py.
 
 Agent = namedtuple("Agent", ["player", "name"])
 
+# attributes that hold per-move search state rather than configuration
+RUNTIME_ATTRIBUTES = {"time_left", "search_stats", "root_move_count"}
+
+
+def _source_hash(paths):
+    """Return a hash of the contents of the given source files, read from
+    disk so that edits made since the modules were imported are seen.
+    """
+    digest = hashlib.sha1()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
 
-def play_round(cpu_agent, test_agents, win_counts, num_matches):
+
+def _package_hash(package):
+    """Return a hash of the source of every module of a package."""
+    return _source_hash(sorted(path for directory in package.__path__
+                               for path in glob.glob(os.path.join(directory, "*.py"))))
+
+
+def code_fingerprint():
+    """Return a hash of the code that plays the games: the rules in the
+    isolation package (including `Board.play`) and `play_round`.
+    """
+    parts = [_package_hash(isolation), _describe(play_round)]
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def _source(value):
+    """Return the source of a function or class, or "" if it has none."""
+    try:
+        with warnings.catch_warnings():
+            # finding a class parses its module, which repeats its warnings
+            warnings.simplefilter("ignore", DeprecationWarning)
+            warnings.simplefilter("ignore", SyntaxWarning)
+            return inspect.getsource(value)
+    except (OSError, TypeError):
+        return ""
+
+
+def _global_names(code):
+    """Yield the global names used by a code object and the code objects
+    nested in it (lambdas, comprehensions and inner functions).
+    """
+    yield from code.co_names
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            yield from _global_names(const)
+
+
+def _describe_code(value, seen):
+    """Describe a function or class by its own source and, recursively, by
+    the functions, classes and constants its code uses through global names.
+    A class uses the globals of all of its methods.
+    """
+    name = "{}.{}".format(value.__module__, value.__qualname__)
+    if name in seen:
+        return name
+    seen.add(name)
+    parts = ["{}:{}".format(name, _source(value))]
+    if inspect.isclass(value):
+        functions = [getattr(attr, "__func__", attr) for attr in vars(value).values()]
+        functions = [f for f in functions if inspect.isfunction(f)]
+    else:
+        functions = [value]
+    for function in functions:
+        namespace = function.__globals__
+        for ref in sorted(set(_global_names(function.__code__))):
+            target = namespace.get(ref)
+            if inspect.isfunction(target) or inspect.isclass(target):
+                parts.append(_describe_code(target, seen))
+            elif isinstance(target, (bool, int, float, str, tuple)):
+                parts.append("{}={!r}".format(ref, target))
+    return "\n".join(parts)
+
+
+def _describe(value):
+    """Return a stable description of an agent parameter for fingerprinting.
+
+    Functions and classes are described by their own source and that of the
+    helpers they call, so editing one score function leaves the description
+    of the others unchanged.
+    """
+    if hasattr(value, "__wrapped__"):
+        # caching wrappers return the same values as the function they wrap
+        return _describe(value.__wrapped__)
+    if inspect.ismethod(value):
+        return _describe_code(value.__func__, set())
+    if inspect.isfunction(value) or inspect.isclass(value):
+        return _describe_code(value, set())
+    if isinstance(value, (list, tuple)):
+        return "[{}]".format(", ".join(_describe(v) for v in value))
+    if isinstance(value, dict):
+        return "{{{}}}".format(", ".join("{}: {}".format(k, _describe(v))
+                                         for k, v in sorted(value.items())))
+    if hasattr(value, "__dict__"):
+        return fingerprint(value)
+    return repr(value)
+
+
+def fingerprint(player):
+    """Return a hash of the code and parameters that determine how an agent
+    plays: the source of every class in its hierarchy and the description of
+    each public configuration attribute (functions are described by their
+    source and that of the helpers they call). Private attributes hold state
+    built while playing.
+    """
+    parts = [_describe(cls) for cls in type(player).__mro__ if cls is not object]
+    parts += ["{}={}".format(name, _describe(value))
+              for name, value in sorted(vars(player).items())
+              if name not in RUNTIME_ATTRIBUTES and not name.startswith("_")]
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+class ResultCache(object):
+    """Results of earlier tournament pairings stored in a JSON file.
+
+    Each entry holds the wins, losses, timeouts and forfeits of one test
+    agent against one cpu agent in one iteration, keyed by the fingerprints
+    of both agents, the code of the game (`code_fingerprint`) and the
+    adjudicator, the number of matches and the time limit.
+    """
+
+    def __init__(self, path, adjudicator=None):
+        self.path = path
+        self.results = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.results = json.load(f)
+        self._rules = code_fingerprint() + _describe(adjudicator)
+        self._fingerprints = {}
+
+    def fingerprint(self, player):
+        """Fingerprint a player the first time it is seen, i.e. before it
+        has played and changed any of its internal state.
+        """
+        if id(player) not in self._fingerprints:
+            self._fingerprints[id(player)] = fingerprint(player)
+        return self._fingerprints[id(player)]
+
+    def key(self, cpu_agent, test_agent, num_matches, iteration):
+        parts = [self.fingerprint(cpu_agent.player), self.fingerprint(test_agent.player),
+                 self._rules, str(num_matches), str(TIME_LIMIT), str(iteration)]
+        return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        return self.results.get(key)
+
+    def put(self, key, result):
+        self.results[key] = result
+
+    def save(self):
+        with open(self.path, "w") as f:
+            json.dump(self.results, f)
+
+    def record(self, cpu_agents, test_agent, num_matches=NUM_MATCHES,
+               iterations=ITERATIONS):
+        """Return the total (wins, games) of a test agent over the cached
+        pairings with the cpu agents, or None if none are cached.
+        """
+        wins = games = 0
+        for iteration in range(iterations):
+            for cpu_agent in cpu_agents:
+                result = self.get(self.key(cpu_agent, test_agent, num_matches, iteration))
+                if result is not None:
+                    wins += result["wins"]
+                    games += result["wins"] + result["losses"]
+        return (wins, games) if games else None
+
+
+def make_test_agents():
+    """Define the agents to compare -- these agents will play from the same
+    starting position against the same adversaries in the tournament.
+    """
+    return [
+        Agent(AlphaBetaPlayer(score_fn=improved_score), "AB_Improved"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score), "AB_Custom"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score_2), "AB_Custom_2"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score_3), "AB_Custom_3")
+    ]
+
+
+def make_cpu_agents():
+    """Define a collection of agents to compete against the test agents. """
+    return [
+        Agent(RandomPlayer(), "Random"),
+        Agent(MinimaxPlayer(score_fn=open_move_score), "MM_Open"),
+        Agent(MinimaxPlayer(score_fn=center_score), "MM_Center"),
+        Agent(MinimaxPlayer(score_fn=improved_score), "MM_Improved"),
+        Agent(AlphaBetaPlayer(score_fn=open_move_score), "AB_Open"),
+        Agent(AlphaBetaPlayer(score_fn=center_score), "AB_Center"),
+        Agent(AlphaBetaPlayer(score_fn=improved_score), "AB_Improved")
+    ]
+
+
+def play_round(cpu_agent, test_agents, win_counts, num_matches, pairing_counts=None,
+               adjudicator=None):
     """Compare the test agents to the cpu agent in "fair" matches.
 
     "Fair" matches use random starting locations and force the agents to
     play as both first and second player to control for advantages resulting
     from choosing better opening moves or having first initiative to move.
+
+    If `pairing_counts` is a dict, it receives the number of timeouts and
+    forfeits in the games of each test agent, keyed by its player object.
+    An optional `adjudicator` (see `isolation.adjudication`) ends games as
+    soon as their result is proven.
     """
     timeout_count = 0
     forfeit_count = 0
@@ -60,26 +279,52 @@ def play_round(cpu_agent, test_agents, win_counts, num_matches):
                 game.apply_move(move)
 
         # play all games and tally the results
-        for game in games:
-            winner, _, termination = game.play(time_limit=TIME_LIMIT)
+        for idx, game in enumerate(games):
+            winner, _, termination = game.play(time_limit=TIME_LIMIT,
+                                               adjudicator=adjudicator)
             win_counts[winner] += 1
 
+            counts = {"timeouts": 0, "forfeits": 0}
+            if pairing_counts is not None:
+                counts = pairing_counts.setdefault(test_agents[idx // 2].player, counts)
+
             if termination == "timeout":
                 timeout_count += 1
+                counts["timeouts"] += 1
             elif termination == "forfeit":
                 forfeit_count += 1
+                counts["forfeits"] += 1
 
     return timeout_count, forfeit_count
 
 
+def share_evaluations(agents, cache):
+    """Make every agent with a score function read and fill the evaluation
+    cache, and return the `CachedScore` wrappers. Agents that use the same
+    score function share its entries.
+    """
+    wrappers = []
+    for agent in agents:
+        score_fn = getattr(agent.player, "score", None)
+        if score_fn is not None and not isinstance(score_fn, CachedScore):
+            agent.player.score = CachedScore(score_fn, cache)
+            wrappers.append(agent.player.score)
+    return wrappers
+
+
 def update(total_wins, wins):
     for player in total_wins:
         total_wins[player] += wins[player]
     return total_wins
 
 
-def play_matches(cpu_agents, test_agents, num_matches):
-    """Play matches between the test agent and each cpu_agent individually. """
+def play_matches(cpu_agents, test_agents, num_matches, cache=None, iteration=0,
+                 adjudicator=None):
+    """Play matches between the test agent and each cpu_agent individually.
+
+    Pairings found in the optional `ResultCache` are not replayed; the results
+    of the pairings that are played are added to it.
+    """
     total_wins = {agent.player: 0 for agent in test_agents}
     total_timeouts = 0.
     total_forfeits = 0.
@@ -94,9 +339,41 @@ def play_matches(cpu_agents, test_agents, num_matches):
 
         print("{!s:^9}{:^13}".format(idx + 1, agent.name), end="", flush=True)
 
-        counts = play_round(agent, test_agents, wins, num_matches)
-        total_timeouts += counts[0]
-        total_forfeits += counts[1]
+        keys, pending = {}, []
+        for test_agent in test_agents:
+            key = None
+            if cache is not None:
+                key = cache.key(agent, test_agent, num_matches, iteration)
+            result = cache.get(key) if cache is not None else None
+            if result is None:
+                keys[test_agent.player] = key
+                pending.append(test_agent)
+                continue
+            wins[test_agent.player] += result["wins"]
+            wins[agent.player] += result["losses"]
+            total_timeouts += result["timeouts"]
+            total_forfeits += result["forfeits"]
+
+        if pending:
+            pending_wins = {test_agent.player: 0 for test_agent in pending}
+            pending_wins[agent.player] = 0
+            pairing_counts = {}
+            counts = play_round(agent, pending, pending_wins, num_matches,
+                                pairing_counts, adjudicator)
+            total_timeouts += counts[0]
+            total_forfeits += counts[1]
+            for test_agent in pending:
+                wins[test_agent.player] += pending_wins[test_agent.player]
+                if cache is not None:
+                    tally = pairing_counts.get(test_agent.player, {})
+                    cache.put(keys[test_agent.player], {
+                        "wins": pending_wins[test_agent.player],
+                        "losses": 2 * num_matches - pending_wins[test_agent.player],
+                        "timeouts": tally.get("timeouts", 0),
+                        "forfeits": tally.get("forfeits", 0)})
+            wins[agent.player] += pending_wins[agent.player]
+            if cache is not None:
+                cache.save()
         total_wins = update(total_wins, wins)
         _total = 2 * num_matches
         round_totals = sum([[wins[agent.player], _total - wins[agent.player]]
@@ -130,26 +407,33 @@ def play_matches(cpu_agents, test_agents, num_matches):
 
 
 def main():
-
-    # Define two agents to compare -- these agents will play from the same
-    # starting position against the same adversaries in the tournament
-    test_agents = [
-        Agent(AlphaBetaPlayer(score_fn=improved_score), "AB_Improved"),
-        Agent(AlphaBetaPlayer(score_fn=custom_score), "AB_Custom"),
-        Agent(AlphaBetaPlayer(score_fn=custom_score_2), "AB_Custom_2"),
-        Agent(AlphaBetaPlayer(score_fn=custom_score_3), "AB_Custom_3")
-    ]
-
-    # Define a collection of agents to compete against the test agents
-    cpu_agents = [
-        Agent(RandomPlayer(), "Random"),
-        Agent(MinimaxPlayer(score_fn=open_move_score), "MM_Open"),
-        Agent(MinimaxPlayer(score_fn=center_score), "MM_Center"),
-        Agent(MinimaxPlayer(score_fn=improved_score), "MM_Improved"),
-        Agent(AlphaBetaPlayer(score_fn=open_move_score), "AB_Open"),
-        Agent(AlphaBetaPlayer(score_fn=center_score), "AB_Center"),
-        Agent(AlphaBetaPlayer(score_fn=improved_score), "AB_Improved")
-    ]
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Replay every pairing instead of reusing cached results.")
+    parser.add_argument("--cache", default=CACHE_FILE,
+                        help="File holding the cached pairing results (default: {}).".format(CACHE_FILE))
+    parser.add_argument("--adjudicate", action="store_true",
+                        help="End games early once the players are partitioned and the result is proven.")
+    parser.add_argument("--eval-cache", type=int, default=0, metavar="SLOTS",
+                        help="Share heuristic values between games in a shared memory "
+                             "cache with this many entries.")
+    parser.add_argument("--eval-cache-name", default=None,
+                        help="Attach to the shared evaluation cache of another tournament process.")
+    args = parser.parse_args()
+    adjudicator = PartitionAdjudicator() if args.adjudicate else None
+    cache = None if args.no_cache else ResultCache(args.cache, adjudicator)
+
+    test_agents = make_test_agents()
+    cpu_agents = make_cpu_agents()
+
+    eval_cache, wrappers = None, []
+    if args.eval_cache_name:
+        eval_cache = EvaluationCache.attach(args.eval_cache_name)
+    elif args.eval_cache:
+        eval_cache = EvaluationCache(args.eval_cache, shared=True)
+        print("Evaluation cache: {}".format(eval_cache.name))
+    if eval_cache is not None:
+        wrappers = share_evaluations(test_agents + cpu_agents, eval_cache)
 
     print(DESCRIPTION)
     print("{:^74}".format("*************************"))
@@ -159,11 +443,22 @@ def main():
     performance = []
 
     for i in range(0, ITERATIONS):
-        performance.append(play_matches(cpu_agents, test_agents, NUM_MATCHES))
+        performance.append(play_matches(cpu_agents, test_agents, NUM_MATCHES, cache, i,
+                                        adjudicator))
 
     for entry in performance:
         print(entry)
 
+    if eval_cache is not None:
+        hits = sum(w.hits for w in wrappers)
+        lookups = hits + sum(w.misses for w in wrappers)
+        print("\nEvaluation cache hit rate: {:.1f}% of {:,d} lookups".format(
+            100. * hits / (lookups or 1), lookups))
+        if args.eval_cache_name:
+            eval_cache.close()
+        else:
+            eval_cache.unlink()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,149 @@
+""" Generate air cargo problems of any size for benchmarking
+
+generate_air_cargo builds an AirCargoProblem from the numbers of cargos,
+planes and airports and a random seed: every cargo and plane starts at a
+random airport, the negative fluents are derived from the positive ones, and
+the goal sends a random sample of the cargos to random airports other than
+their origin. Planes can fly between any two airports, so with at least one
+plane every such goal is solvable.
+
+Run as a script to build a ladder of problems of increasing size and,
+optionally, solve each one:
+
+    python air_cargo_generator.py
+    python air_cargo_generator.py --sizes 4,2,4 8,4,8 --search astar_search_h_ignore_preconditions --bitmask
+"""
+import argparse
+import random
+from timeit import default_timer as timer
+
+from aimacode.search import InstrumentedProblem
+from aimacode.utils import Expr
+from lp_utils import FluentState
+from my_air_cargo_problems import AirCargoBitProblem, AirCargoProblem
+from run_search import SEARCHES
+
+DEFAULT_LADDER = [(2, 2, 2), (3, 3, 3), (4, 2, 4), (6, 3, 6), (8, 4, 8),
+                  (12, 6, 12), (16, 8, 25), (20, 10, 50)]
+
+
+def air_cargo_fluents(cargos: list, planes: list, airports: list) -> list:
+    """ all fluents of an air cargo problem
+
+    :param cargos: list of str
+    :param planes: list of str
+    :param airports: list of str
+    :return: list of expr, the At(cargo, airport), In(cargo, plane) and
+        At(plane, airport) fluents
+    """
+    symbols = {name: Expr(name) for name in cargos + planes + airports}
+    fluents = []
+    for c in cargos:
+        fluents.extend(Expr('At', symbols[c], symbols[a]) for a in airports)
+        fluents.extend(Expr('In', symbols[c], symbols[p]) for p in planes)
+    for p in planes:
+        fluents.extend(Expr('At', symbols[p], symbols[a]) for a in airports)
+    return fluents
+
+
+def complete_state(pos: list, fluents: list) -> FluentState:
+    """ FluentState in which the given fluents are true and all other fluents false
+
+    :param pos: list of expr, the true fluents
+    :param fluents: list of expr, every fluent of the problem
+    :return: FluentState object
+    """
+    true = set(pos)
+    return FluentState(list(pos), [fluent for fluent in fluents if fluent not in true])
+
+
+def generate_air_cargo(num_cargos: int, num_planes: int, num_airports: int, seed=None,
+                       num_goals=None, problem_class=AirCargoProblem) -> AirCargoProblem:
+    """ build a random air cargo problem
+
+    :param num_cargos: int
+        number of cargos, named C1, C2, ...
+    :param num_planes: int
+        number of planes, named P1, P2, ...; at least 1
+    :param num_airports: int
+        number of airports, named A1, A2, ...; at least 2
+    :param seed: seed of the random number generator
+    :param num_goals: int
+        number of cargos that must be delivered (default: all of them)
+    :param problem_class: AirCargoProblem or a subclass such as AirCargoBitProblem
+    :return: problem_class instance
+    """
+    if num_planes < 1 or num_airports < 2:
+        raise ValueError("air cargo problems need at least one plane and two airports")
+    if num_goals is None:
+        num_goals = num_cargos
+    if not 0 <= num_goals <= num_cargos:
+        raise ValueError("num_goals must be between 0 and the number of cargos")
+
+    rng = random.Random(seed)
+    cargos = ['C{}'.format(i + 1) for i in range(num_cargos)]
+    planes = ['P{}'.format(i + 1) for i in range(num_planes)]
+    airports = ['A{}'.format(i + 1) for i in range(num_airports)]
+    fluents = air_cargo_fluents(cargos, planes, airports)
+    symbols = {arg.op: arg for fluent in fluents for arg in fluent.args}
+
+    origin = {name: rng.choice(airports) for name in cargos + planes}
+    pos = [Expr('At', symbols[name], symbols[origin[name]]) for name in cargos + planes]
+
+    goal = []
+    for c in sorted(rng.sample(cargos, num_goals), key=cargos.index):
+        destination = rng.choice([a for a in airports if a != origin[c]])
+        goal.append(Expr('At', symbols[c], symbols[destination]))
+
+    return problem_class(cargos, planes, airports, complete_state(pos, fluents), goal)
+
+
+def parse_size(text: str) -> tuple:
+    """ parse a CARGOS,PLANES,AIRPORTS size """
+    try:
+        size = tuple(int(n) for n in text.split(','))
+    except ValueError:
+        size = ()
+    if len(size) != 3:
+        raise argparse.ArgumentTypeError("expected CARGOS,PLANES,AIRPORTS, got {!r}".format(text))
+    return size
+
+
+def main(argv=None):
+    searches = {name: (search, heuristic) for name, search, heuristic in SEARCHES}
+    parser = argparse.ArgumentParser(description="Build (and optionally solve) a ladder of " +
+                                     "random air cargo problems of increasing size.")
+    parser.add_argument('--sizes', nargs='+', type=parse_size, default=DEFAULT_LADDER,
+                        metavar='C,P,A', help="Problem sizes as cargos,planes,airports.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--search', choices=sorted(searches),
+                        help="Solve each problem with this search from run_search.")
+    parser.add_argument('--bitmask', action='store_true',
+                        help="Use integer-bitmask states (AirCargoBitProblem).")
+    args = parser.parse_args(argv)
+
+    problem_class = AirCargoBitProblem if args.bitmask else AirCargoProblem
+    print("{:>6} {:>6} {:>8} {:>8} {:>8} {:>9}".format(
+        "Cargos", "Planes", "Airports", "Fluents", "Actions", "Build(s)") +
+        ("  {:>6} {:>10} {:>9}".format("Plan", "Expansions", "Solve(s)") if args.search else ""))
+    for num_cargos, num_planes, num_airports in args.sizes:
+        start = timer()
+        problem = generate_air_cargo(num_cargos, num_planes, num_airports, args.seed,
+                                     problem_class=problem_class)
+        build = timer() - start
+        row = "{:>6} {:>6} {:>8} {:>8} {:>8} {:>9.3f}".format(
+            num_cargos, num_planes, num_airports, len(problem.state_map),
+            len(problem.actions_list), build)
+        if args.search:
+            search, heuristic = searches[args.search]
+            ip = InstrumentedProblem(problem)
+            start = timer()
+            node = search(ip, getattr(problem, heuristic)) if heuristic else search(ip)
+            solve = timer() - start
+            plan = len(node.solution()) if node else '-'
+            row += "  {:>6} {:>10} {:>9.3f}".format(plan, ip.succs, solve)
+        print(row, flush=True)
+
+
+if __name__ == '__main__':
+    main()
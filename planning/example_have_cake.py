@@ -1,4 +1,3 @@
-from aimacode.logic import PropKB
 from aimacode.planning import Action
 from aimacode.search import (
     Node, breadth_first_search, astar_search, depth_first_graph_search,
@@ -6,7 +5,7 @@ from aimacode.search import (
 )
 from aimacode.utils import expr
 from lp_utils import (
-    FluentState, encode_state, decode_state
+    FluentCodec, FluentState,
 )
 from my_planning_graph import PlanningGraph
 from run_search import run_search
@@ -17,7 +16,8 @@ from functools import lru_cache
 class HaveCakeProblem(Problem):
     def __init__(self, initial: FluentState, goal: list):
         self.state_map = initial.pos + initial.neg
-        Problem.__init__(self, encode_state(initial, self.state_map), goal=goal)
+        self.codec = FluentCodec(self.state_map)
+        Problem.__init__(self, self.codec.encode(initial), goal=goal)
         self.actions_list = self.get_actions()
 
     def get_actions(self):
@@ -39,42 +39,27 @@ class HaveCakeProblem(Problem):
 
     def actions(self, state: str) -> list:  # of Action
         possible_actions = []
-        kb = PropKB()
-        kb.tell(decode_state(state, self.state_map).pos_sentence())
+        pos = self.codec.pos_set(state)
         for action in self.actions_list:
             is_possible = True
             for clause in action.precond_pos:
-                if clause not in kb.clauses:
+                if clause not in pos:
                     is_possible = False
             for clause in action.precond_neg:
-                if clause in kb.clauses:
+                if clause in pos:
                     is_possible = False
             if is_possible:
                 possible_actions.append(action)
         return possible_actions
 
     def result(self, state: str, action: Action):
-        new_state = FluentState([], [])
-        old_state = decode_state(state, self.state_map)
-        for fluent in old_state.pos:
-            if fluent not in action.effect_rem:
-                new_state.pos.append(fluent)
-        for fluent in action.effect_add:
-            if fluent not in new_state.pos:
-                new_state.pos.append(fluent)
-        for fluent in old_state.neg:
-            if fluent not in action.effect_add:
-                new_state.neg.append(fluent)
-        for fluent in action.effect_rem:
-            if fluent not in new_state.neg:
-                new_state.neg.append(fluent)
-        return encode_state(new_state, self.state_map)
+        pos = self.codec.pos_set(state).difference(action.effect_rem).union(action.effect_add)
+        return self.codec.encode_pos(pos)
 
     def goal_test(self, state: str) -> bool:
-        kb = PropKB()
-        kb.tell(decode_state(state, self.state_map).pos_sentence())
+        pos = self.codec.pos_set(state)
         for clause in self.goal:
-            if clause not in kb.clauses:
+            if clause not in pos:
                 return False
         return True
 
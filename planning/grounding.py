@@ -0,0 +1,203 @@
+""" Grounding of typed action schemas into concrete Action objects
+
+Building ground actions by formatting strings and parsing them with expr()
+costs a parse per literal, and grounds actions that can never be executed.
+A Grounder instead binds the typed parameters of each ActionSchema to the
+problem objects as plain tuples and builds the Expr literals directly,
+interning each literal so that every action shares one Expr object (and its
+cached hash) per fluent. It then keeps only the actions whose positive
+preconditions are reachable from the initial state when delete effects are
+ignored (relaxed reachability).
+
+Example:
+
+    load = ActionSchema(('Load', 'c', 'p', 'a'),
+                        [('c', 'cargo'), ('p', 'plane'), ('a', 'airport')],
+                        precond_pos=[('At', 'c', 'a'), ('At', 'p', 'a')],
+                        effect_add=[('In', 'c', 'p')],
+                        effect_rem=[('At', 'c', 'a')])
+    grounder = Grounder({'cargo': cargos, 'plane': planes, 'airport': airports}, initial.pos)
+    actions = grounder.ground([load])
+"""
+from itertools import product
+from operator import itemgetter
+
+from aimacode.planning import Action
+from aimacode.utils import Expr
+
+
+class ActionSchema():
+    """ an action schema with typed parameters
+
+    Literals, including the action itself, are tuples of a predicate name
+    followed by parameter names, e.g. ('At', 'c', 'a').
+
+    :param head: tuple literal naming the action and its arguments
+    :param params: list of (name, type) pairs; ground actions are generated
+        with the first parameter varying slowest
+    :param precond_pos: list of literals that must be true
+    :param precond_neg: list of literals that must be false
+    :param effect_add: list of literals made true
+    :param effect_rem: list of literals made false
+    :param distinct: list of pairs of parameter names that must be bound to
+        different objects
+    """
+
+    def __init__(self, head, params, precond_pos=(), precond_neg=(), effect_add=(),
+                 effect_rem=(), distinct=()):
+        self.head = tuple(head)
+        self.params = list(params)
+        self.precond_pos = [tuple(literal) for literal in precond_pos]
+        self.precond_neg = [tuple(literal) for literal in precond_neg]
+        self.effect_add = [tuple(literal) for literal in effect_add]
+        self.effect_rem = [tuple(literal) for literal in effect_rem]
+        self.distinct = list(distinct)
+
+        position = {name: i for i, (name, _) in enumerate(self.params)}
+        self._position = position
+        self._distinct = [(position[a], position[b]) for a, b in self.distinct]
+
+    def compile_literals(self, literals):
+        """ compile literals to (predicate, getter) pairs, where getter maps a
+        binding tuple to the tuple of objects the literal takes
+
+        :param literals: list of literals
+        :return: list of (str, callable)
+        """
+        return [(literal[0], _getter([self._position[name] for name in literal[1:]]))
+                for literal in literals]
+
+    def bindings(self, objects: dict):
+        """ generate the tuples of objects the parameters can be bound to
+
+        :param objects: dict mapping each type to a list of object names
+        """
+        distinct = self._distinct
+        for binding in product(*[objects[kind] for _, kind in self.params]):
+            if all(binding[a] != binding[b] for a, b in distinct):
+                yield binding
+
+
+def _getter(positions):
+    if len(positions) == 1:
+        i = positions[0]
+        return lambda binding: (binding[i],)
+    if not positions:
+        return lambda binding: ()
+    return itemgetter(*positions)
+
+
+def fluent_key(fluent) -> tuple:
+    """ key of a ground fluent, e.g. ('At', ('C1', 'SFO')) for expr('At(C1, SFO)')
+
+    :param fluent: expr
+    :return: (str, tuple of str)
+    """
+    return fluent.op, tuple(arg.op for arg in fluent.args)
+
+
+class _Symbols(dict):
+    """ interned Expr symbols by name, created on first lookup """
+
+    def __missing__(self, name):
+        symbol = self[name] = Expr(name)
+        return symbol
+
+
+class _Literals(dict):
+    """ interned Expr literals by fluent key, created on first lookup """
+
+    def __init__(self):
+        dict.__init__(self)
+        self.symbols = _Symbols()
+
+    def __missing__(self, key):
+        predicate, args = key
+        symbols = self.symbols
+        literal = self[key] = Expr(predicate, *[symbols[name] for name in args])
+        return literal
+
+
+class Grounder():
+    """ instantiate action schemas over typed objects without string parsing
+
+    :param objects: dict mapping each parameter type to a list of object names
+    :param initial_pos: list of the fluents (as expr) true in the initial state
+    :param prune: drop ground actions whose positive preconditions are not
+        reachable from the initial state in the relaxed problem
+    """
+
+    def __init__(self, objects: dict, initial_pos: list, prune=True):
+        self.objects = {kind: list(names) for kind, names in objects.items()}
+        self.initial_pos = list(initial_pos)
+        self.prune = prune
+        self._literals = _Literals()
+        for fluent in self.initial_pos:
+            self._literals.setdefault(fluent_key(fluent), fluent)
+
+    def literal(self, key: tuple) -> Expr:
+        """ the interned Expr of a fluent key, see fluent_key """
+        return self._literals[key]
+
+    def ground(self, schemas: list) -> list:
+        """ ground every schema, in schema order
+
+        :param schemas: list of ActionSchema
+        :return: list of Action objects
+        """
+        literals = self._literals
+        candidates = []
+        for schema in schemas:
+            compiled = [schema.compile_literals(templates) for templates in
+                        (schema.precond_pos, schema.precond_neg,
+                         schema.effect_add, schema.effect_rem, [schema.head])]
+            for binding in schema.bindings(self.objects):
+                candidates.append([[literals[predicate, getter(binding)] for predicate, getter in templates]
+                                   for templates in compiled])
+
+        if self.prune:
+            reachable = self.relaxed_reachable(candidates)
+            candidates = [c for c, keep in zip(candidates, reachable) if keep]
+
+        return [Action(head, [precond_pos, precond_neg], [effect_add, effect_rem])
+                for precond_pos, precond_neg, effect_add, effect_rem, (head,) in candidates]
+
+    def relaxed_reachable(self, candidates: list) -> list:
+        """ flag the ground actions that become applicable when negative
+        preconditions and delete effects are ignored
+
+        Each action waits on a count of its unreached positive preconditions,
+        so every fluent and action is processed once.
+
+        :param candidates: list of [precond_pos, precond_neg, effect_add, effect_rem, [head]]
+            lists of interned literals
+        :return: list of bool, parallel to candidates
+        """
+        missing = []
+        waiting = {}
+        for i, candidate in enumerate(candidates):
+            precond_pos = set(candidate[0])
+            missing.append(len(precond_pos))
+            for fluent in precond_pos:
+                waiting.setdefault(fluent, []).append(i)
+
+        reached = set(self.initial_pos)
+        fired = [False] * len(candidates)
+        queue = list(reached)
+
+        def fire(i):
+            fired[i] = True
+            for fluent in candidates[i][2]:
+                if fluent not in reached:
+                    reached.add(fluent)
+                    queue.append(fluent)
+
+        for i, count in enumerate(missing):
+            if not count:
+                fire(i)
+        while queue:
+            for i in waiting.get(queue.pop(), ()):
+                missing[i] -= 1
+                if not missing[i]:
+                    fire(i)
+        return fired
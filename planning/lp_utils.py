@@ -1,6 +1,18 @@
+from collections import namedtuple
+from functools import lru_cache
+
 from aimacode.logic import associate
 from aimacode.utils import expr
 
+_TF_TO_BITS = str.maketrans('TF', '10')
+_BITS_TO_TF = str.maketrans('10', 'TF')
+
+CompiledAction = namedtuple('CompiledAction', ['action', 'pre_pos', 'pre_neg', 'add', 'rem'])
+CompiledAction.__doc__ = """ an Action with its preconditions and effects as bitmasks over a fluent map
+
+bit i of each mask stands for fluent_map[i]; see compile_action
+"""
+
 
 class FluentState():
     """ state object for planning problems as positive and negative fluents
@@ -41,13 +53,8 @@ def encode_state(fs: FluentState, fluent_map: list) -> str:
     :param fluent_map: ordered list of possible fluents for the problem
     :return: str eg. "TFFTFT" string of mapped positive and negative fluents
     """
-    state_tf = []
-    for fluent in fluent_map:
-        if fluent in fs.pos:
-            state_tf.append('T')
-        else:
-            state_tf.append('F')
-    return "".join(state_tf)
+    pos = set(fs.pos)
+    return "".join(['T' if fluent in pos else 'F' for fluent in fluent_map])
 
 
 def decode_state(state: str, fluent_map: list) -> FluentState:
@@ -66,3 +73,149 @@ def decode_state(state: str, fluent_map: list) -> FluentState:
         else:
             fs.neg.append(fluent_map[idx])
     return fs
+
+
+def tf_to_bits(state: str) -> int:
+    """ convert a string of T/F to an int with bit i set when state[i] is 'T'
+
+    :param state: str eg. "TFFTFT" string of mapped positive and negative fluents
+    :return: int eg. 0b101001
+    """
+    if not state:
+        return 0
+    return int(state[::-1].translate(_TF_TO_BITS), 2)
+
+
+def bits_to_tf(state: int, size: int) -> str:
+    """ convert an int state back to a string of T/F, the inverse of tf_to_bits
+
+    :param state: int with bit i set for each positive fluent i
+    :param size: number of fluents in the fluent map
+    :return: str eg. "TFFTFT"
+    """
+    if not size:
+        return ''
+    return format(state, '0{}b'.format(size))[::-1].translate(_BITS_TO_TF)
+
+
+def fluent_mask(fluents, fluent_index: dict) -> int:
+    """ bitmask of a collection of fluents
+
+    :param fluents: iterable of fluents (as expr)
+    :param fluent_index: dict mapping each fluent to its position in the fluent map
+    :return: int with the bit of each fluent set
+    """
+    mask = 0
+    for fluent in fluents:
+        mask |= 1 << fluent_index[fluent]
+    return mask
+
+
+def bit_indices(state: int):
+    """ yield the index of every set bit of an int state, lowest first
+
+    :param state: int with bit i set for each positive fluent i
+    """
+    while state:
+        low = state & -state
+        yield low.bit_length() - 1
+        state ^= low
+
+
+def compile_action(action, fluent_index: dict) -> CompiledAction:
+    """ compile the preconditions and effects of an action to bitmasks
+
+    An int state s satisfies the preconditions when s & pre_pos == pre_pos
+    and not s & pre_neg, and the successor state is (s & ~rem) | add.
+
+    :param action: Action object
+    :param fluent_index: dict mapping each fluent to its position in the fluent map
+    :return: CompiledAction
+    """
+    return CompiledAction(action,
+                          fluent_mask(action.precond_pos, fluent_index),
+                          fluent_mask(action.precond_neg, fluent_index),
+                          fluent_mask(action.effect_add, fluent_index),
+                          fluent_mask(action.effect_rem, fluent_index))
+
+
+class FluentCodec():
+    """ encoder and decoder of T/F states over one fluent map, built once per problem
+
+    The fluent to index dict makes encoding O(n) in the number of fluents,
+    and the sets of positive fluents of recently seen states are cached, so
+    callers that only test membership never build a FluentState.
+
+    :param fluent_map: ordered list of possible fluents for the problem
+    :param cache_size: number of states whose positive fluents are cached
+    """
+
+    def __init__(self, fluent_map: list, cache_size=8192):
+        self.fluent_map = tuple(fluent_map)
+        self.index = {fluent: i for i, fluent in enumerate(self.fluent_map)}
+        self.size = len(self.fluent_map)
+        self.pos_set = lru_cache(maxsize=cache_size)(self._pos_set)
+
+    def __len__(self):
+        return self.size
+
+    def encode(self, fs: FluentState) -> str:
+        """ encode a FluentState to a string of T/F, like encode_state
+
+        :param fs: FluentState object
+        :return: str eg. "TFFTFT"
+        """
+        return self.encode_pos(fs.pos)
+
+    def encode_pos(self, fluents) -> str:
+        """ encode the state in which exactly the given fluents are true
+
+        :param fluents: iterable of fluents; fluents not in the map are ignored
+        :return: str eg. "TFFTFT"
+        """
+        state_tf = ['F'] * self.size
+        index = self.index
+        for fluent in fluents:
+            i = index.get(fluent)
+            if i is not None:
+                state_tf[i] = 'T'
+        return "".join(state_tf)
+
+    def decode(self, state: str) -> FluentState:
+        """ decode a string of T/F to a FluentState, like decode_state
+
+        :param state: str eg. "TFFTFT"
+        :return: FluentState object
+        """
+        fs = FluentState([], [])
+        pos_append, neg_append = fs.pos.append, fs.neg.append
+        for fluent, char in zip(self.fluent_map, state):
+            if char == 'T':
+                pos_append(fluent)
+            else:
+                neg_append(fluent)
+        return fs
+
+    def _pos_set(self, state: str) -> frozenset:
+        """ the set of fluents that are true in a state (cached as pos_set)
+
+        :param state: str eg. "TFFTFT"
+        :return: frozenset of fluents
+        """
+        return frozenset([fluent for fluent, char in zip(self.fluent_map, state) if char == 'T'])
+
+    def pos_indices(self, state: str) -> list:
+        """ the fluent map indices of the fluents that are true in a state
+
+        :param state: str eg. "TFFTFT"
+        :return: list of int
+        """
+        return [i for i, char in enumerate(state) if char == 'T']
+
+    def to_bits(self, state: str) -> int:
+        """ convert a T/F state to an int state, see tf_to_bits """
+        return tf_to_bits(state)
+
+    def from_bits(self, state: int) -> str:
+        """ convert an int state to a T/F state, see bits_to_tf """
+        return bits_to_tf(state, self.size)
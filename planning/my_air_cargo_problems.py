@@ -1,17 +1,37 @@
-from aimacode.logic import PropKB
 from aimacode.planning import Action
 from aimacode.search import (
     Node, Problem,
 )
 from aimacode.utils import expr
+from grounding import ActionSchema, Grounder
 from lp_utils import (
-    FluentState, encode_state, decode_state,
+    FluentCodec, FluentState, bit_indices, compile_action, fluent_mask,
 )
-from my_planning_graph import PlanningGraph
+from my_planning_graph import ArrayPlanningGraph, PlanningGraphTables
 
 from functools import lru_cache
 
 
+AIR_CARGO_SCHEMAS = [
+    ActionSchema(('Load', 'c', 'p', 'a'),
+                 [('c', 'cargo'), ('p', 'plane'), ('a', 'airport')],
+                 precond_pos=[('At', 'p', 'a'), ('At', 'c', 'a')],
+                 effect_add=[('In', 'c', 'p')],
+                 effect_rem=[('At', 'c', 'a')]),
+    ActionSchema(('Unload', 'c', 'p', 'a'),
+                 [('c', 'cargo'), ('p', 'plane'), ('a', 'airport')],
+                 precond_pos=[('At', 'p', 'a'), ('In', 'c', 'p')],
+                 effect_add=[('At', 'c', 'a')],
+                 effect_rem=[('In', 'c', 'p')]),
+    ActionSchema(('Fly', 'p', 'fr', 'to'),
+                 [('fr', 'airport'), ('to', 'airport'), ('p', 'plane')],
+                 precond_pos=[('At', 'p', 'fr')],
+                 effect_add=[('At', 'p', 'to')],
+                 effect_rem=[('At', 'p', 'fr')],
+                 distinct=[('fr', 'to')]),
+]
+
+
 class AirCargoProblem(Problem):
     def __init__(self, cargos, planes, airports, initial: FluentState, goal: list):
         """
@@ -28,19 +48,54 @@ class AirCargoProblem(Problem):
             literal fluents required for goal test
         """
         self.state_map = initial.pos + initial.neg
-        self.initial_state_TF = encode_state(initial, self.state_map)
+        self.codec = FluentCodec(self.state_map)
+        self.initial_state_TF = self.codec.encode(initial)
         Problem.__init__(self, self.initial_state_TF, goal=goal)
         self.cargos = cargos
         self.planes = planes
         self.airports = airports
         self.actions_list = self.get_actions()
+        self.fluent_index = self.codec.index
+        self.build_precondition_index()
+        self._graph_tables = None
+
+    def build_precondition_index(self):
+        """ Index every action of actions_list under its first positive precondition.
+
+        For Load, Unload and Fly that is the location of the plane, so the
+        candidates in a state are the actions of each plane at its current
+        airport instead of all ground actions. Actions without positive
+        preconditions are candidates in every state.
+        """
+        self.precondition_index = [[] for _ in self.state_map]
+        self.unconditional_actions = []
+        for i, action in enumerate(self.actions_list):
+            if action.precond_pos:
+                self.precondition_index[self.fluent_index[action.precond_pos[0]]].append(i)
+            else:
+                self.unconditional_actions.append(i)
+
+    def candidate_actions(self, true_fluents) -> list:
+        """ Return the actions_list positions of the actions that may be
+        applicable given the indices of the true fluents, in increasing order.
+
+        :param true_fluents: iterable of int
+            state_map indices of the fluents that are true
+        :return: list of int
+        """
+        candidates = list(self.unconditional_actions)
+        for i in true_fluents:
+            candidates.extend(self.precondition_index[i])
+        candidates.sort()
+        return candidates
 
     def get_actions(self):
         """
         This method creates concrete actions (no variables) for all actions in the problem
         domain action schema and turns them into complete Action objects as defined in the
-        aimacode.planning module. It is computationally expensive to call this method directly;
-        however, it is called in the constructor and the results cached in the `actions_list` property.
+        aimacode.planning module, grounding AIR_CARGO_SCHEMAS with a Grounder. Actions that are not
+        reachable from the initial state, even ignoring delete effects, are left out. It is called
+        in the constructor and the results cached in the `actions_list` property.
 
         Returns:
         ----------
@@ -48,74 +103,9 @@ class AirCargoProblem(Problem):
             list of Action objects
         """
 
-        # TODO create concrete Action objects based on the domain action schema for: Load, Unload, and Fly
-        # concrete actions definition: specific literal action that does not include variables as with the schema
-        # for example, the action schema 'Load(c, p, a)' can represent the concrete actions 'Load(C1, P1, SFO)'
-        # or 'Load(C2, P2, JFK)'.  The actions for the planning problem must be concrete because the problems in
-        # forward search and Planning Graphs must use Propositional Logic
-
-        def load_actions():
-            """Create all concrete Load actions and return a list
-
-            :return: list of Action objects
-            """
-            loads = []
-            for c in self.cargos:
-                for p in self.planes:
-                    for a in self.airports:
-                        precond_pos = [expr("At({}, {})".format(p, a)),
-                                       expr("At({}, {})".format(c, a))]
-                        precond_neg = []
-                        effect_add = [expr("In({}, {})".format(c, p))]
-                        effect_rem = [expr("At({}, {})".format(c, a))]
-                        load = Action(expr("Load({}, {}, {})".format(c, p, a)),
-                                      [precond_pos, precond_neg],
-                                      [effect_add, effect_rem])
-                        loads.append(load)
-            return loads
-
-        def unload_actions():
-            """Create all concrete Unload actions and return a list
-
-            :return: list of Action objects
-            """
-            unloads = []
-            for c in self.cargos:
-                for p in self.planes:
-                    for a in self.airports:
-                        precond_pos = [expr("At({}, {})".format(p, a)),
-                                       expr("In({}, {})".format(c, p))]
-                        precond_neg = []
-                        effect_add = [expr("At({}, {})".format(c, a))]
-                        effect_rem = [expr("In({}, {})".format(c, p))]
-                        unload = Action(expr("Unload({}, {}, {})".format(c, p, a)),
-                                        [precond_pos, precond_neg],
-                                        [effect_add, effect_rem])
-                        unloads.append(unload)
-            return unloads
-
-        def fly_actions():
-            """Create all concrete Fly actions and return a list
-
-            :return: list of Action objects
-            """
-            flys = []
-            for fr in self.airports:
-                for to in self.airports:
-                    if fr != to:
-                        for p in self.planes:
-                            precond_pos = [expr("At({}, {})".format(p, fr)),
-                                           ]
-                            precond_neg = []
-                            effect_add = [expr("At({}, {})".format(p, to))]
-                            effect_rem = [expr("At({}, {})".format(p, fr))]
-                            fly = Action(expr("Fly({}, {}, {})".format(p, fr, to)),
-                                         [precond_pos, precond_neg],
-                                         [effect_add, effect_rem])
-                            flys.append(fly)
-            return flys
-
-        return load_actions() + unload_actions() + fly_actions()
+        objects = {'cargo': self.cargos, 'plane': self.planes, 'airport': self.airports}
+        grounder = Grounder(objects, self.codec.decode(self.initial_state_TF).pos)
+        return grounder.ground(AIR_CARGO_SCHEMAS)
 
     def actions(self, state: str) -> list:
         """ Return the actions that can be executed in the given state.
@@ -126,18 +116,18 @@ class AirCargoProblem(Problem):
         :return: list of Action objects
         """
         possible_actions = []
-        kb = PropKB()
-        kb.tell(decode_state(state, self.state_map).pos_sentence())
+        pos = self.codec.pos_set(state)
+        candidates = self.candidate_actions(self.codec.pos_indices(state))
 
-        for action in self.actions_list:
+        for action in (self.actions_list[i] for i in candidates):
             is_possible = True
             for clause in action.precond_pos:
-                if clause not in kb.clauses:
+                if clause not in pos:
                     is_possible = False
                     break  # A precondition is violated, no need to continue the check
             if is_possible:
                 for clause in action.precond_neg:
-                    if clause in kb.clauses:
+                    if clause in pos:
                         is_possible = False
                         break  # A precondition is violated, no need to continue the check
             if is_possible:
@@ -153,24 +143,8 @@ class AirCargoProblem(Problem):
         :param action: Action applied
         :return: resulting state after action
         """
-        old_state = decode_state(state, self.state_map)
-        new_state = FluentState([], [])
-
-        for fluent in old_state.pos:
-            if fluent not in action.effect_rem:
-                new_state.pos.append(fluent)
-        for fluent in old_state.neg:
-            if fluent not in action.effect_add:
-                new_state.neg.append(fluent)
-
-        for fluent in action.effect_add:
-            if fluent not in new_state.pos:
-                new_state.pos.append(fluent)
-        for fluent in action.effect_rem:
-            if fluent not in new_state.neg:
-                new_state.neg.append(fluent)
-
-        return encode_state(new_state, self.state_map)
+        pos = self.codec.pos_set(state).difference(action.effect_rem).union(action.effect_add)
+        return self.codec.encode_pos(pos)
 
     def goal_test(self, state: str) -> bool:
         """ Test the state to see if goal is reached
@@ -178,10 +152,9 @@ class AirCargoProblem(Problem):
         :param state: str representing state
         :return: bool
         """
-        kb = PropKB()
-        kb.tell(decode_state(state, self.state_map).pos_sentence())
+        pos = self.codec.pos_set(state)
         for clause in self.goal:
-            if clause not in kb.clauses:
+            if clause not in pos:
                 return False
         return True
 
@@ -197,11 +170,22 @@ class AirCargoProblem(Problem):
         out from the current state in order to satisfy each individual goal
         condition.
         """
-        # requires implemented PlanningGraph class
-        pg = PlanningGraph(self, node.state)
+        pg = self.planning_graph(node.state, mutexes=False)
         pg_levelsum = pg.h_levelsum()
         return pg_levelsum
 
+    def planning_graph(self, state: str, mutexes=True) -> ArrayPlanningGraph:
+        """ Build the planning graph of a state, with the integer-indexed tables
+        of the problem built on first use and shared by all graphs.
+
+        :param state: str representing state
+        :param mutexes: bool (whether to compute mutexes; level costs do not need them)
+        :return: ArrayPlanningGraph
+        """
+        if self._graph_tables is None:
+            self._graph_tables = PlanningGraphTables(self)
+        return ArrayPlanningGraph(self, state, tables=self._graph_tables, mutexes=mutexes)
+
     @lru_cache(maxsize=8192)
     def h_ignore_preconditions(self, node: Node):
         """This heuristic estimates the minimum number of actions that must be
@@ -210,15 +194,103 @@ class AirCargoProblem(Problem):
         executed.
         """
         count = 0
-        kb = PropKB()
-        kb.tell(decode_state(node.state, self.state_map).pos_sentence())
+        pos = self.codec.pos_set(node.state)
         for clause in self.goal:
-            if clause not in kb.clauses:
+            if clause not in pos:
                 count += 1
         return count
 
 
-def air_cargo_p1() -> AirCargoProblem:
+class AirCargoBitProblem(AirCargoProblem):
+    """ AirCargoProblem with states encoded as ints instead of T/F strings
+
+    Bit i of a state is set when the fluent state_map[i] is true. Every
+    ground action is compiled once into precondition and effect bitmasks, so
+    that actions, result and goal_test are a few integer operations per action
+    instead of decoding the state into lists of expr.
+    """
+
+    def __init__(self, cargos, planes, airports, initial: FluentState, goal: list):
+        """
+
+        :param cargos: list of str
+            cargos in the problem
+        :param planes: list of str
+            planes in the problem
+        :param airports: list of str
+            airports in the problem
+        :param initial: FluentState object
+            positive and negative literal fluents (as expr) describing initial state
+        :param goal: list of expr
+            literal fluents required for goal test
+        """
+        AirCargoProblem.__init__(self, cargos, planes, airports, initial, goal)
+        self.initial = self.codec.to_bits(self.initial_state_TF)
+        self.goal_mask = fluent_mask(self.goal, self.fluent_index)
+        self.compiled_actions = [compile_action(action, self.fluent_index)
+                                 for action in self.actions_list]
+        self._compiled = {c.action: c for c in self.compiled_actions}
+
+    def compiled(self, action: Action):
+        """ Return the CompiledAction of an action, compiling it on first use
+        if it is not one of actions_list.
+        """
+        c = self._compiled.get(action)
+        if c is None:
+            c = self._compiled[action] = compile_action(action, self.fluent_index)
+        return c
+
+    def to_tf(self, state: int) -> str:
+        """ Return the T/F string encoding of an int state. """
+        return self.codec.from_bits(state)
+
+    def actions(self, state: int) -> list:
+        """ Return the actions that can be executed in the given state.
+
+        :param state: int
+            state represented as bits of mapped fluents (state variables)
+        :return: list of Action objects
+        """
+        compiled_actions = self.compiled_actions
+        candidates = (compiled_actions[i] for i in self.candidate_actions(bit_indices(state)))
+        return [c.action for c in candidates
+                if state & c.pre_pos == c.pre_pos and not state & c.pre_neg]
+
+    def result(self, state: int, action: Action) -> int:
+        """ Return the state that results from executing the given
+        action in the given state. The action must be one of
+        self.actions(state).
+
+        :param state: state entering node
+        :param action: Action applied
+        :return: resulting state after action
+        """
+        c = self.compiled(action)
+        return state & ~c.rem | c.add
+
+    def goal_test(self, state: int) -> bool:
+        """ Test the state to see if goal is reached
+
+        :param state: int representing state
+        :return: bool
+        """
+        return state & self.goal_mask == self.goal_mask
+
+    @lru_cache(maxsize=8192)
+    def h_pg_levelsum(self, node: Node):
+        """Level-sum heuristic of AirCargoProblem, built from the T/F encoding
+        of the node state.
+        """
+        pg = self.planning_graph(self.to_tf(node.state), mutexes=False)
+        return pg.h_levelsum()
+
+    @lru_cache(maxsize=8192)
+    def h_ignore_preconditions(self, node: Node):
+        """Number of goal fluents that are false in the node state. """
+        return bin(self.goal_mask & ~node.state).count('1')
+
+
+def air_cargo_p1(problem_class=AirCargoProblem) -> AirCargoProblem:
     cargos = ['C1', 'C2']
     planes = ['P1', 'P2']
     airports = ['JFK', 'SFO']
@@ -240,10 +312,10 @@ def air_cargo_p1() -> AirCargoProblem:
     goal = [expr('At(C1, JFK)'),
             expr('At(C2, SFO)'),
             ]
-    return AirCargoProblem(cargos, planes, airports, init, goal)
+    return problem_class(cargos, planes, airports, init, goal)
 
 
-def air_cargo_p2() -> AirCargoProblem:
+def air_cargo_p2(problem_class=AirCargoProblem) -> AirCargoProblem:
     cargos = ['C1', 'C2', 'C3']
     planes = ['P1', 'P2', 'P3']
     airports = ['JFK', 'SFO', 'ATL']
@@ -282,10 +354,10 @@ def air_cargo_p2() -> AirCargoProblem:
             expr('At(C3, SFO)'),
             ]
 
-    return AirCargoProblem(cargos, planes, airports, init, goal)
+    return problem_class(cargos, planes, airports, init, goal)
 
 
-def air_cargo_p3() -> AirCargoProblem:
+def air_cargo_p3(problem_class=AirCargoProblem) -> AirCargoProblem:
     cargos = ['C1', 'C2', 'C3', 'C4']
     planes = ['P1', 'P2']
     airports = ['JFK', 'SFO', 'ATL', 'ORD']
@@ -329,4 +401,4 @@ def air_cargo_p3() -> AirCargoProblem:
             expr('At(C3, JFK)'),
             expr('At(C4, SFO)'),
             ]
-    return AirCargoProblem(cargos, planes, airports, init, goal)
+    return problem_class(cargos, planes, airports, init, goal)
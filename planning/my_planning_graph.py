@@ -1,3 +1,5 @@
+import numpy as np
+
 from aimacode.planning import Action
 from aimacode.search import Problem
 from aimacode.utils import expr, Expr
@@ -563,3 +565,260 @@ class PlanningGraph():
                 return float('Inf')
 
         return level_sum
+
+
+def _scatter_or(target, index, values):
+    """target[index[i]] |= values[i] for every row i of values, with repeated indices OR-ed together"""
+    if not len(index):
+        return
+    order = np.argsort(index, kind='stable')
+    index = index[order]
+    starts = np.flatnonzero(np.r_[True, index[1:] != index[:-1]])
+    target[index[starts]] |= np.logical_or.reduceat(values[order], starts, axis=0)
+
+
+class PlanningGraphTables():
+    """Integer-indexed literals and actions of a planning problem, built once
+    per problem and shared by every ArrayPlanningGraph of that problem.
+
+    Literal i is the positive literal of fluent state_map[i] and literal n + i
+    its negation, where n is the number of fluents; the extra literal id 2n
+    pads the precondition and effect rows and never holds. Actions are the
+    ground actions of actions_list followed by the no-op of each literal, as
+    in PlanningGraph.
+
+    :param problem: PlanningProblem (or subclass such as AirCargoProblem or HaveCakeProblem)
+    Instance variables calculated:
+        pre_ids: int matrix (actions x max preconditions), the precondition literals of each action
+        eff_ids: int matrix (actions x max effects), the effect literals of each action
+        negation: int vector mapping each literal id to the id of its negation
+        persistent: bool vector, True for the actions whose preconditions equal their effects
+        goal: int vector of the positive literals of the goal
+    """
+
+    def __init__(self, problem: Problem):
+        self.fluent_map = list(problem.state_map)
+        n = len(self.fluent_map)
+        index = {fluent: i for i, fluent in enumerate(self.fluent_map)}
+
+        pres, effs = [], []
+        for action in problem.actions_list:
+            pres.append([index[f] for f in action.precond_pos] +
+                        [n + index[f] for f in action.precond_neg])
+            effs.append([index[f] for f in action.effect_add] +
+                        [n + index[f] for f in action.effect_rem])
+        pres.extend([literal] for literal in range(2 * n))
+        effs.extend([literal] for literal in range(2 * n))
+
+        self.num_fluents = n
+        self.num_literals = 2 * n
+        self.num_actions = len(pres)
+        self.pre_ids = self._padded(pres)
+        self.eff_ids = self._padded(effs)
+        self.negation = np.concatenate([np.arange(n, 2 * n), np.arange(n), [2 * n]])
+        self.persistent = np.array([set(pre) == set(eff) for pre, eff in zip(pres, effs)])
+        self.goal = np.array([index[goal] for goal in problem.goal], dtype=int)
+
+    def _padded(self, rows):
+        width = max([1] + [len(row) for row in rows])
+        ids = np.full((len(rows), width), self.num_literals, dtype=np.intp)
+        for i, row in enumerate(rows):
+            ids[i, :len(row)] = row
+        return ids
+
+    def literals(self, state: str) -> np.ndarray:
+        """bool vector of the literals that hold in a state
+
+        :param state: str (in form TFTTFF... representing fluent states)
+        :return: bool vector over literal ids
+        """
+        pos = np.frombuffer(state.encode('ascii'), dtype=np.uint8) == ord('T')
+        return np.concatenate([pos, ~pos])
+
+
+class ArrayPlanningGraph():
+    """
+    The planning graph of PlanningGraph over integer literal and action ids.
+
+    Each S level is a bool vector over literals with its mutexes as a bool
+    matrix, and each A level a vector of action ids. The levels themselves do
+    not depend on mutexes, so a graph built with mutexes=False (as h_levelsum
+    needs) costs one gather over the precondition table per level.
+
+    Action mutexes are only computed between rows of persistent actions (the
+    no-ops) and all actions of a level, because in a serial planning graph
+    every other pair is mutex anyway; a graph that is not serial computes
+    every row. The mutex tests are gathers of bool matrices over the
+    precondition and effect ids, so memory grows with no-ops x actions
+    rather than actions x actions:
+        inconsistent effects / interference: an effect of one action is the
+            negation of an effect or precondition of the other
+        competing needs: a precondition of one action is mutex with a
+            precondition of the other
+        inconsistent support: two literals have no pair of non-mutex achievers
+    """
+
+    def __init__(self, problem: Problem, state: str, serial_planning=True, tables=None,
+                 mutexes=True):
+        """
+        :param problem: PlanningProblem (or subclass such as AirCargoProblem or HaveCakeProblem)
+        :param state: str (will be in form TFTTFF... representing fluent states)
+        :param serial_planning: bool (whether or not to assume that only one action can occur at a time)
+        :param tables: PlanningGraphTables of the problem, built if None
+        :param mutexes: bool (whether to compute action and literal mutexes)
+        Instance variables calculated:
+            s_levels: list of bool vectors, the literals of each S level
+            s_mutex: list of bool matrices, the literal mutexes of each S level (empty without mutexes)
+            a_levels: list of int vectors, the action ids of each A level
+            a_mutex: list of (rows, block) per A level (empty without mutexes): the positions in
+                a_levels of the actions whose mutexes were computed, and their bool mutex matrix
+                with all actions of the level; see action_mutex
+        """
+        self.problem = problem
+        self.tables = PlanningGraphTables(problem) if tables is None else tables
+        self.serial = serial_planning
+        self.mutexes = mutexes
+        self.s_levels = []
+        self.s_mutex = []
+        self.a_levels = []
+        self.a_mutex = []
+        self.create_graph(state)
+
+    def create_graph(self, state: str):
+        """ build the graph from S0 until the last two S levels hold the same literals
+
+        :param state: str (in form TFTTFF... representing fluent states)
+        """
+        t = self.tables
+        literals = t.literals(state)
+        # no mutexes at the first level
+        s_mutex = np.zeros((t.num_literals, t.num_literals), dtype=bool) if self.mutexes else None
+
+        while True:
+            self.s_levels.append(literals)
+            if s_mutex is not None:
+                self.s_mutex.append(s_mutex)
+            actions, a_mutex = self.add_action_level(literals, s_mutex)
+            next_literals, s_mutex = self.add_literal_level(actions, a_mutex)
+            if (next_literals == literals).all():
+                break
+            literals = next_literals
+        # the last level repeats the previous literals but completes the graph as PlanningGraph does
+        self.s_levels.append(next_literals)
+        if s_mutex is not None:
+            self.s_mutex.append(s_mutex)
+
+    def add_action_level(self, literals, s_mutex):
+        """ add the A level of the actions whose preconditions all hold in an S level
+
+        :param literals: bool vector of the S level
+        :param s_mutex: bool matrix of the literal mutexes of the S level, or None
+        :return: (int vector of action ids, (rows, block) of their mutexes or None)
+        """
+        t = self.tables
+        holds = np.append(literals, True)
+        actions = np.flatnonzero(holds[t.pre_ids].all(axis=1))
+        self.a_levels.append(actions)
+        if s_mutex is None:
+            return actions, None
+
+        pre, eff = t.pre_ids[actions], t.eff_ids[actions]
+        if self.serial:
+            rows = np.flatnonzero(t.persistent[actions])
+        else:
+            rows = np.arange(len(actions))
+        r = np.arange(len(rows))[:, None]
+        size = t.num_literals + 1
+
+        row_pre = np.zeros((len(rows), size), dtype=bool)
+        row_pre[r, pre[rows]] = True
+        row_eff = np.zeros((len(rows), size), dtype=bool)
+        row_eff[r, eff[rows]] = True
+        row_pre[:, -1] = row_eff[:, -1] = False
+        # the literals that negate a precondition or an effect of each row action
+        pre_negated = row_pre[:, t.negation]
+        eff_negated = row_eff[:, t.negation]
+        # the literals mutex with a precondition of each row action
+        s_mutex_ext = np.zeros((size, size), dtype=bool)
+        s_mutex_ext[:-1, :-1] = s_mutex
+        needs = np.zeros((len(rows), size), dtype=bool)
+        for j in range(pre.shape[1]):
+            needs |= s_mutex_ext[pre[rows, j]]
+
+        # inconsistent effects and interference on the effects of the other action,
+        # interference and competing needs on its preconditions
+        on_effect = eff_negated | pre_negated
+        on_precondition = eff_negated | needs
+        block = np.zeros((len(rows), len(actions)), dtype=bool)
+        for j in range(eff.shape[1]):
+            block |= on_effect[:, eff[:, j]]
+        for j in range(pre.shape[1]):
+            block |= on_precondition[:, pre[:, j]]
+        block[r[:, 0], rows] = False
+
+        self.a_mutex.append((rows, block))
+        return actions, (rows, block)
+
+    def add_literal_level(self, actions, a_mutex):
+        """ compute the S level of the effects of an A level
+
+        :param actions: int vector of the action ids of the A level
+        :param a_mutex: (rows, block) of their mutexes, or None
+        :return: (bool vector of literals, bool matrix of their mutexes or None)
+        """
+        t = self.tables
+        eff = t.eff_ids[actions]
+        holds = np.zeros(t.num_literals + 1, dtype=bool)
+        holds[eff.ravel()] = True
+        literals = holds[:-1]
+        if a_mutex is None:
+            return literals, None
+
+        rows, block = a_mutex
+        size = t.num_literals + 1
+        supported = np.zeros((size, size), dtype=bool)
+        # a single action achieves both literals
+        for j1 in range(eff.shape[1]):
+            for j2 in range(eff.shape[1]):
+                supported[eff[:, j1], eff[:, j2]] = True
+        # a row action and an action it is not mutex with (every other pair is mutex)
+        partners = np.zeros((size, len(rows)), dtype=bool)
+        compatible = ~block.T
+        for j in range(eff.shape[1]):
+            _scatter_or(partners, eff[:, j], compatible)
+        partners = partners.T
+        for j in range(eff.shape[1]):
+            _scatter_or(supported, eff[rows, j], partners)
+        supported |= supported.T
+
+        # inconsistent support, and negation
+        s_mutex = ~supported[:-1, :-1]
+        s_mutex[np.arange(t.num_literals), t.negation[:-1]] = True
+        s_mutex &= np.outer(literals, literals)
+        np.fill_diagonal(s_mutex, False)
+        return literals, s_mutex
+
+    def action_mutex(self, level: int) -> np.ndarray:
+        """ the full bool mutex matrix of the actions of an A level, indexed like
+        a_levels[level]; it has actions^2 entries, so only for small graphs
+
+        :param level: int
+        :return: bool matrix
+        """
+        rows, block = self.a_mutex[level]
+        num_actions = len(self.a_levels[level])
+        mutex = np.full((num_actions, num_actions), self.serial)
+        mutex[rows, :] = block
+        mutex[:, rows] = block.T
+        np.fill_diagonal(mutex, False)
+        return mutex
+
+    def h_levelsum(self) -> int:
+        """The sum of the level costs of the individual goals (admissible if goals independent)
+
+        :return: int
+        """
+        levels = np.array(self.s_levels)[:, self.tables.goal]
+        if not levels[-1].all():
+            return float('Inf')
+        return int(levels.argmax(axis=0).sum())
@@ -5,7 +5,7 @@ from aimacode.search import (breadth_first_search, astar_search,
     breadth_first_tree_search, depth_first_graph_search, uniform_cost_search,
     greedy_best_first_graph_search, depth_limited_search,
     recursive_best_first_search)
-from my_air_cargo_problems import air_cargo_p1, air_cargo_p2, air_cargo_p3
+from my_air_cargo_problems import AirCargoBitProblem, air_cargo_p1, air_cargo_p2, air_cargo_p3
 from threading import Thread
 import functools
 from os.path import join
@@ -34,7 +34,10 @@ _TIMEOUT = 600
 
 PROBLEMS = [["Air Cargo Problem 1", air_cargo_p1],
             ["Air Cargo Problem 2", air_cargo_p2],
-            ["Air Cargo Problem 3", air_cargo_p3]]
+            ["Air Cargo Problem 3", air_cargo_p3],
+            ["Air Cargo Problem 1 (bitmask states)", functools.partial(air_cargo_p1, AirCargoBitProblem)],
+            ["Air Cargo Problem 2 (bitmask states)", functools.partial(air_cargo_p2, AirCargoBitProblem)],
+            ["Air Cargo Problem 3 (bitmask states)", functools.partial(air_cargo_p3, AirCargoBitProblem)]]
 SEARCHES = [["breadth_first_search", breadth_first_search, ""],
             ['breadth_first_tree_search', breadth_first_tree_search, ""],
             ['depth_first_graph_search', depth_first_graph_search, ""],
@@ -2,13 +2,17 @@ import os
 import sys
 import unittest
 
+from aimacode.logic import PropKB
 from aimacode.planning import Action
 from aimacode.utils import expr
-from aimacode.search import Node
-from lp_utils import decode_state
+from aimacode.search import Node, astar_search
+from lp_utils import FluentCodec, FluentState, decode_state, encode_state
 
+from air_cargo_generator import generate_air_cargo
+from example_have_cake import have_cake
+from grounding import ActionSchema, Grounder
 from my_air_cargo_problems import (
-    air_cargo_p1, air_cargo_p2, air_cargo_p3,
+    AirCargoBitProblem, air_cargo_p1, air_cargo_p2, air_cargo_p3,
 )
 
 class TestAirCargoProb1(unittest.TestCase):
@@ -80,5 +84,175 @@ class TestAirCargoMethods(unittest.TestCase):
         n = Node(self.p1.initial)
         self.assertEqual(self.p1.h_ignore_preconditions(n),2)
 
+class TestAirCargoBitProblem(unittest.TestCase):
+
+    def setUp(self):
+        self.p2 = air_cargo_p2()
+        self.bits = air_cargo_p2(AirCargoBitProblem)
+
+    def test_initial_state(self):
+        self.assertEqual(self.bits.to_tf(self.bits.initial), self.p2.initial)
+
+    def test_matches_string_states(self):
+        # walk both encodings side by side through a few levels of the state space
+        frontier = [(self.p2.initial, self.bits.initial)]
+        for _ in range(3):
+            successors = []
+            for state, bits in frontier:
+                self.assertEqual(self.bits.to_tf(bits), state)
+                self.assertEqual(self.bits.goal_test(bits), self.p2.goal_test(state))
+                self.assertEqual(self.bits.h_ignore_preconditions(Node(bits)),
+                                 self.p2.h_ignore_preconditions(Node(state)))
+                actions = self.p2.actions(state)
+                self.assertEqual([str(a) for a in self.bits.actions(bits)],
+                                 [str(a) for a in actions])
+                for action, bit_action in zip(actions, self.bits.actions(bits)):
+                    successors.append((self.p2.result(state, action),
+                                       self.bits.result(bits, bit_action)))
+            frontier = successors[::7]
+
+    def test_result_of_new_action(self):
+        p1 = air_cargo_p1(AirCargoBitProblem)
+        act1 = Action(
+            expr('Load(C1, P1, SFO)'),
+            [[expr('At(C1, SFO)'), expr('At(P1, SFO)')], []],
+            [[expr('In(C1, P1)')], [expr('At(C1, SFO)')]]
+        )
+        fs = decode_state(p1.to_tf(p1.result(p1.initial, act1)), p1.state_map)
+        self.assertTrue(expr('In(C1, P1)') in fs.pos)
+        self.assertTrue(expr('At(C1, SFO)') in fs.neg)
+
+
+class TestFluentCodec(unittest.TestCase):
+
+    def setUp(self):
+        self.p2 = air_cargo_p2()
+        self.codec = FluentCodec(self.p2.state_map)
+
+    def test_matches_encode_decode_state(self):
+        state = self.p2.result(self.p2.initial, self.p2.actions(self.p2.initial)[0])
+        fs = decode_state(state, self.p2.state_map)
+        self.assertEqual(self.codec.encode(fs), encode_state(fs, self.p2.state_map))
+        decoded = self.codec.decode(state)
+        self.assertEqual((decoded.pos, decoded.neg), (fs.pos, fs.neg))
+        self.assertEqual(self.codec.pos_set(state), set(fs.pos))
+        self.assertEqual([self.p2.state_map[i] for i in self.codec.pos_indices(state)], fs.pos)
+        self.assertEqual(self.codec.from_bits(self.codec.to_bits(state)), state)
+
+    def test_ignores_unmapped_fluents(self):
+        fs = FluentState([expr('At(C1, SFO)'), expr('At(C9, SFO)')], [])
+        self.assertEqual(self.codec.encode(fs), encode_state(fs, self.p2.state_map))
+
+
+class TestGrounder(unittest.TestCase):
+
+    def test_matches_parsed_actions(self):
+        p2 = air_cargo_p2()
+        for action in p2.actions_list:
+            for literal in action.precond_pos + action.effect_add + action.effect_rem:
+                self.assertEqual(literal, expr(str(literal)))
+                self.assertIn(literal, p2.state_map)
+        loads = [a for a in p2.actions_list if a.name == 'Load']
+        self.assertEqual(len(loads), 27)
+        load = loads[0]
+        self.assertEqual(str(load), 'Load(C1, P1, JFK)')
+        self.assertEqual(load.precond_pos, [expr('At(P1, JFK)'), expr('At(C1, JFK)')])
+        self.assertEqual(load.effect_add, [expr('In(C1, P1)')])
+        self.assertEqual(load.effect_rem, [expr('At(C1, JFK)')])
+        flys = [str(a) for a in p2.actions_list if a.name == 'Fly']
+        self.assertEqual(flys[:3], ['Fly(P1, JFK, SFO)', 'Fly(P2, JFK, SFO)', 'Fly(P3, JFK, SFO)'])
+        self.assertEqual(len(flys), 18)
+
+    def test_prunes_unreachable_actions(self):
+        fly = ActionSchema(('Fly', 'p', 'fr', 'to'),
+                           [('p', 'plane'), ('fr', 'airport'), ('to', 'airport')],
+                           precond_pos=[('At', 'p', 'fr')],
+                           effect_add=[('At', 'p', 'to')],
+                           effect_rem=[('At', 'p', 'fr')],
+                           distinct=[('fr', 'to')])
+        refuel = ActionSchema(('Refuel', 'p', 'a'), [('p', 'plane'), ('a', 'airport')],
+                              precond_pos=[('At', 'p', 'a'), ('Tanker', 'a')],
+                              effect_add=[('Fueled', 'p')])
+        objects = {'plane': ['P1'], 'airport': ['JFK', 'SFO', 'ATL']}
+        initial = [expr('At(P1, JFK)'), expr('Tanker(ATL)')]
+        actions = Grounder(objects, initial).ground([fly, refuel])
+        self.assertEqual([str(a) for a in actions],
+                         ['Fly(P1, JFK, SFO)', 'Fly(P1, JFK, ATL)', 'Fly(P1, SFO, JFK)',
+                          'Fly(P1, SFO, ATL)', 'Fly(P1, ATL, JFK)', 'Fly(P1, ATL, SFO)',
+                          'Refuel(P1, ATL)'])
+        unpruned = Grounder(objects, initial, prune=False).ground([fly, refuel])
+        self.assertEqual(len(unpruned), 9)
+
+
+class TestAirCargoGenerator(unittest.TestCase):
+
+    def test_matches_hand_written_sizes(self):
+        p3 = generate_air_cargo(4, 2, 4, seed=3)
+        self.assertEqual(len(p3.initial), len(air_cargo_p3().initial))
+        self.assertEqual(len(p3.actions_list), len(air_cargo_p3().actions_list))
+        self.assertEqual(len(p3.goal), 4)
+
+    def test_initial_state(self):
+        p = generate_air_cargo(5, 3, 6, seed=1, num_goals=2)
+        fs = decode_state(p.initial, p.state_map)
+        self.assertEqual(len(fs.pos), 8)
+        self.assertEqual(len(set(fs.pos + fs.neg)), 5 * 6 + 5 * 3 + 3 * 6)
+        located = sorted(str(fluent.args[0]) for fluent in fs.pos if fluent.op == 'At')
+        self.assertEqual(located, ['C1', 'C2', 'C3', 'C4', 'C5', 'P1', 'P2', 'P3'])
+        self.assertEqual(len(p.goal), 2)
+        self.assertFalse(any(goal in fs.pos for goal in p.goal))
+
+    def test_deterministic_and_solvable(self):
+        p = generate_air_cargo(3, 2, 3, seed=7, problem_class=AirCargoBitProblem)
+        again = generate_air_cargo(3, 2, 3, seed=7, problem_class=AirCargoBitProblem)
+        self.assertEqual((p.initial, p.goal), (again.initial, again.goal))
+        node = astar_search(p, p.h_ignore_preconditions)
+        self.assertTrue(p.goal_test(node.state))
+
+    def test_rejects_unsolvable_sizes(self):
+        self.assertRaises(ValueError, generate_air_cargo, 2, 0, 3)
+        self.assertRaises(ValueError, generate_air_cargo, 2, 1, 1)
+
+
+def propkb_actions(problem, state):
+    # the PropKB based implementation that set-based actions() replaced
+    kb = PropKB()
+    kb.tell(decode_state(state, problem.state_map).pos_sentence())
+    return [action for action in problem.actions_list
+            if all(clause in kb.clauses for clause in action.precond_pos) and
+            not any(clause in kb.clauses for clause in action.precond_neg)]
+
+
+def propkb_goal_test(problem, state):
+    kb = PropKB()
+    kb.tell(decode_state(state, problem.state_map).pos_sentence())
+    return all(clause in kb.clauses for clause in problem.goal)
+
+
+class TestActionsRegression(unittest.TestCase):
+
+    def check_states(self, problem, levels):
+        frontier, seen = [problem.initial], {problem.initial}
+        for _ in range(levels):
+            successors = []
+            for state in frontier:
+                actions = problem.actions(state)
+                self.assertEqual(actions, propkb_actions(problem, state))
+                self.assertEqual(problem.goal_test(state), propkb_goal_test(problem, state))
+                for action in actions:
+                    child = problem.result(state, action)
+                    if child not in seen:
+                        seen.add(child)
+                        successors.append(child)
+            frontier = successors
+
+    def test_have_cake(self):
+        self.check_states(have_cake(), 4)
+
+    def test_air_cargo(self):
+        self.check_states(air_cargo_p1(), 4)
+        self.check_states(air_cargo_p3(), 2)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -5,9 +5,10 @@ import unittest
 from aimacode.utils import expr
 from aimacode.planning import Action
 from example_have_cake import have_cake
+from my_air_cargo_problems import air_cargo_p1
 
 from my_planning_graph import (
-    PlanningGraph, PgNode_a, PgNode_s, mutexify
+    ArrayPlanningGraph, PlanningGraph, PlanningGraphTables, PgNode_a, PgNode_s, mutexify
 )
 
 
@@ -123,5 +124,44 @@ class TestPlanningGraphHeuristics(unittest.TestCase):
         self.assertEqual(self.pg.h_levelsum(), 1)
 
 
+class TestArrayPlanningGraph(unittest.TestCase):
+
+    def literal_id(self, tables, node):
+        i = tables.fluent_map.index(node.symbol)
+        return i if node.is_pos else i + tables.num_fluents
+
+    def assertSameGraph(self, problem, state, serial=True):
+        tables = PlanningGraphTables(problem)
+        pg = PlanningGraph(problem, state, serial)
+        apg = ArrayPlanningGraph(problem, state, serial, tables=tables)
+        self.assertEqual(len(apg.s_levels), len(pg.s_levels))
+        for level, s_level in enumerate(pg.s_levels):
+            self.assertEqual(set(apg.s_levels[level].nonzero()[0]),
+                             {self.literal_id(tables, node) for node in s_level})
+            self.assertEqual(set(zip(*apg.s_mutex[level].nonzero())),
+                             {(self.literal_id(tables, node), self.literal_id(tables, other))
+                              for node in s_level for other in node.mutex})
+        for level, a_level in enumerate(pg.a_levels):
+            self.assertEqual(len(apg.a_levels[level]), len(a_level))
+            self.assertEqual(apg.action_mutex(level).sum(), sum(len(node.mutex) for node in a_level))
+        self.assertEqual(apg.h_levelsum(), pg.h_levelsum())
+        no_mutex = ArrayPlanningGraph(problem, state, serial, tables=tables, mutexes=False)
+        self.assertEqual(no_mutex.h_levelsum(), pg.h_levelsum())
+        self.assertEqual(no_mutex.s_mutex, [])
+
+    def test_have_cake(self):
+        p = have_cake()
+        self.assertSameGraph(p, p.initial)
+        self.assertSameGraph(p, p.result(p.initial, p.actions_list[0]))
+
+    def test_air_cargo(self):
+        p = air_cargo_p1()
+        state = p.initial
+        for _ in range(3):
+            self.assertSameGraph(p, state)
+            self.assertSameGraph(p, state, serial=False)
+            state = p.result(state, p.actions(state)[-1])
+
+
 if __name__ == '__main__':
     unittest.main()